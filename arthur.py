@@ -6,6 +6,17 @@
 # Last updated: July 21, 2014
 
 import sys
+import time
+from collections import namedtuple
+
+from bitboard import bits, popcount
+from book import Book
+from checkers import REPETITIONS
+from evalcache import EvalCache
+from ordering import MoveOrderer
+from position import Position, PositionLine
+from tablebase import Tablebase, WIN, LOSS
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
 
 # Constants
 BLACK, WHITE = 0, 1
@@ -13,6 +24,55 @@ VALID_SQUARES = 0x7FBFDFEFF
 
 INFINITY = sys.maxsize
 
+# Deepest iteration of a search with a time limit
+MAX_DEPTH = 64
+
+# Default limits of quiescence search: the captures followed past a
+# leaf, and the quiescence nodes searched below one leaf
+QUIESCENCE_DEPTH = 16
+QUIESCENCE_NODES = 200
+
+# Search modes. ALPHABETA searches every root move with a full window
+# and alpha-beta below the root. PVS searches all but the first move
+# of every node, the root included, with a null window, and searches
+# again only moves that fail high. ASPIRATION is PVS with the root
+# window narrowed to ASPIRATION_WINDOW either side of the previous
+# iteration's score, widened again when the score falls outside it.
+# The window is the material value of one piece.
+ALPHABETA, PVS, ASPIRATION = 'alphabeta', 'pvs', 'aspiration'
+ASPIRATION_WINDOW = 2**20
+
+# Selective search, off unless move_function turns it on. Late move
+# reductions search the quiet moves of a node from the LMR_MOVES-th
+# on, LMR_DEPTH or more plies from the leaves, one ply shallower with
+# a null window, and search them in full only if they beat alpha.
+# Futility pruning skips the quiet moves of a node one ply from the
+# leaves when its material (piece_score_diff) plus FUTILITY_MARGIN
+# cannot reach alpha. The margin is the material value of one man.
+LMR_MOVES = 3
+LMR_DEPTH = 3
+FUTILITY_MARGIN = 2**21
+
+# Squares a man is crowned on, by colour; moves to them change the
+# material and are never reduced or pruned
+PROMOTION_ROWS = (0x780000000, 0xf)
+
+# Transposition table kept between calls to move_function
+_table = TranspositionTable()
+
+# Features of recently evaluated positions, by Zobrist hash
+_eval_cache = EvalCache()
+
+# Endgame tablebases opened by move_function, by directory
+_tablebases = {}
+
+# Opening books opened by move_function, by file
+_books = {}
+
+# The rest of a composite move that move_function has started: the
+# next single jump to make, keyed by the hash of the board before it
+_pending_hops = {}
+
 # Feature functions
 def adv(board): # Advancement
     """
@@ -30,7 +90,7 @@ def adv(board): # Advancement
 
     bits_3_and_4 = rows_3_and_4 & board.pieces[passive]
     bits_5_and_6 = rows_5_and_6 & board.pieces[passive]
-    return bin(bits_5_and_6).count("1") - bin(bits_3_and_4).count("1")
+    return popcount(bits_5_and_6) - popcount(bits_3_and_4)
 
 def back(board): # Back Row Bridge
     """
@@ -49,7 +109,7 @@ def back(board): # Back Row Bridge
             return 0
         back_row_bridge = 0x5
 
-    if bin(back_row_bridge & board.pieces[passive]).count('1') == 2:
+    if popcount(back_row_bridge & board.pieces[passive]) == 2:
         return 1
     return 0
 
@@ -65,7 +125,7 @@ def cent(board): # Center Control I
     else:
         center_pieces = 0xCC3280
 
-    return bin(board.pieces[passive] & center_pieces).count("1")
+    return popcount(board.pieces[passive] & center_pieces)
 
 def cntr(board): # Center Control II
     """
@@ -80,18 +140,24 @@ def cntr(board): # Center Control II
     else:
         center_pieces = 0xCC3280
 
-    active_center_count = bin(board.pieces[active] & center_pieces).count("1")
+    active_center_count = popcount(board.pieces[active] & center_pieces)
 
-    moves = board.get_moves()
-    if moves[0] < 0:
-        moves = map(lambda x: x*(-1), moves)
-    destinations = reduce(lambda x, y: x|y,
-                          [(m & (m ^ board.pieces[active])) for m in moves])
-
-    active_near_center_count = bin(destinations & center_pieces).count("1")
+    destinations = _destinations(board.get_moves(), board.pieces[active])
+    active_near_center_count = popcount(destinations & center_pieces)
 
     return active_center_count + active_near_center_count
 
+def _destinations(moves, active_pieces):
+    """
+        Returns the union of the squares the given moves end on.
+    """
+    if moves[0] < 0:
+        moves = [-m for m in moves]
+    destinations = 0
+    for m in moves:
+        destinations |= m & (m ^ active_pieces)
+    return destinations
+
 def deny(board): # Denial of Occupancy
     """
         The parameter is credited 1 for each square defined in MOB if
@@ -103,48 +169,47 @@ def deny(board): # Denial of Occupancy
     rb = board.right_backward()
     lb = board.left_backward()
 
-    moves =  [0x11 << i for (i, bit) in enumerate(bin(rf)[::-1]) if bit == '1']
-    moves += [0x21 << i for (i, bit) in enumerate(bin(lf)[::-1]) if bit == '1']
-    moves += [0x11 << i - 4 for (i, bit) in enumerate(bin(rb)[::-1]) if bit == '1']
-    moves += [0x21 << i - 5 for (i, bit) in enumerate(bin(lb)[::-1]) if bit == '1']
+    return _denials(board, rf, lf, rb, lb)
 
-    destinations =  [0x10 << i for (i, bit) in enumerate(bin(rf)[::-1]) if bit == '1']
-    destinations += [0x20 << i for (i, bit) in enumerate(bin(lf)[::-1]) if bit == '1']
-    destinations += [0x1 << i - 4 for (i, bit) in enumerate(bin(rb)[::-1]) if bit == '1']
-    destinations += [0x1 << i - 5 for (i, bit) in enumerate(bin(lb)[::-1]) if bit == '1']
+def _denials(board, rf, lf, rb, lb):
+    """
+        Returns DENY for board given its right_forward(),
+        left_forward(), right_backward() and left_backward() masks.
+    """
+    moves =  [0x11 * b for b in bits(rf)]
+    moves += [0x21 * b for b in bits(lf)]
+    moves += [0x11 * b for b in bits(rb >> 4)]
+    moves += [0x21 * b for b in bits(lb >> 5)]
+
+    destinations = bits(rf << 4) + bits(lf << 5) + bits(rb >> 4) + bits(lb >> 5)
 
     denials = []
 
     for move, dest in zip(moves, destinations):
-        B = board.peek_move(move)
-        active = B.active
+        board.push(move)
+        active = board.active
         ms_taking = []
         ds = []
-        if (B.forward[active] & (dest >> 4)) != 0 and (B.empty & (dest << 4)) != 0:
+        if (board.forward[active] & (dest >> 4)) != 0 and (board.empty & (dest << 4)) != 0:
             ms_taking.append((-1)*((dest >> 4) | (dest << 4)))
             ds.append(dest << 4)
-        if (B.forward[active] & (dest >> 5)) != 0 and (B.empty & (dest << 5)) != 0:
+        if (board.forward[active] & (dest >> 5)) != 0 and (board.empty & (dest << 5)) != 0:
             ms_taking.append((-1)*((dest >> 5) | (dest << 5)))
             ds.append(dest << 5)
-        if (B.backward[active] & (dest << 4)) != 0 and (B.empty & (dest >> 4)) != 0:
+        if (board.backward[active] & (dest << 4)) != 0 and (board.empty & (dest >> 4)) != 0:
             ms_taking.append((-1)*((dest << 4) | (dest >> 4)))
             ds.append(dest >> 4)
-        if (B.backward[active] & (dest << 5)) != 0 and (B.empty & (dest >> 5)) != 0:
+        if (board.backward[active] & (dest << 5)) != 0 and (board.empty & (dest >> 5)) != 0:
             ms_taking.append((-1)*((dest << 5) | (dest >> 5)))
             ds.append(dest >> 5)
 
-        if not ms_taking:
-            continue
-        else:
-            for m, d in zip(ms_taking, ds):
-                C = B.peek_move(m)
-                if C.active == active:
-                    if not dest in denials:
-                        denials.append(dest)
-                    continue
-                if not C.takeable(d):
-                    if not dest in denials:
-                        denials.append(dest)
+        for m, d in zip(ms_taking, ds):
+            board.push(m)
+            if board.active == active or not board.takeable(d):
+                if not dest in denials:
+                    denials.append(dest)
+            board.pop()
+        board.pop()
 
     return len(denials)
 
@@ -163,7 +228,7 @@ def kcent(board): # King Center Control
         center_pieces = 0xCC3280
         passive_kings = board.backward[BLACK]
 
-    return bin(passive_kings & center_pieces).count("1")
+    return popcount(passive_kings & center_pieces)
 
 
 def mob(board): # Total Mobility
@@ -178,14 +243,7 @@ def mob(board): # Total Mobility
     rb = board.right_backward()
     lb = board.left_backward()
 
-    destinations =  [0x10 << i for (i, bit) in enumerate(bin(rf)[::-1]) if bit == '1']
-    destinations += [0x20 << i for (i, bit) in enumerate(bin(lf)[::-1]) if bit == '1']
-    destinations += [0x1 << i - 4 for (i, bit) in enumerate(bin(rb)[::-1]) if bit == '1']
-    destinations += [0x1 << i - 5 for (i, bit) in enumerate(bin(lb)[::-1]) if bit == '1']
-
-    if not destinations:
-        return 0
-    return bin(reduce(lambda x, y: x|y, destinations)).count("1")
+    return popcount((rf << 4) | (lf << 5) | (rb >> 4) | (lb >> 5))
 
 def mobil(board): # Undenied Mobility
     """
@@ -201,11 +259,11 @@ def mov(board): # Move
         and if an odd number of pieces are in the move system, defined
         as those vertical files starting with squares 1, 2, 3, and 4.
     """
-    black_men = bin(board.forward[BLACK]).count("1")
-    black_kings = bin(board.backward[BLACK]).count("1")
+    black_men = popcount(board.forward[BLACK])
+    black_kings = popcount(board.backward[BLACK])
     black_score = 2*black_men + 3*black_kings
-    white_men = bin(board.backward[WHITE]).count("1")
-    white_kings = bin(board.forward[WHITE]).count("1")
+    white_men = popcount(board.backward[WHITE])
+    white_kings = popcount(board.forward[WHITE])
     white_score = 2*white_men + 3*white_kings
 
     if white_score < 24 and black_score == white_score:
@@ -214,7 +272,7 @@ def mov(board): # Move
             move_system =  0x783c1e0f
         else:
             move_system = 0x783c1e0f0
-        if bin(move_system & pieces).count("1") % 2 == 1:
+        if popcount(move_system & pieces) % 2 == 1:
             return 1
 
     return 0
@@ -225,45 +283,41 @@ def thret(board): # Threat
         active piece may be moved and in doing so threaten to capture
         a passive piece on a subsequent move.
     """
-    moves = board.get_moves()
-    destinations = map(lambda x: (x ^ board.pieces[board.active]) & x, moves)
-    origins = [x ^ y for (x, y) in zip(moves, destinations)]
+    return _threats(board, board.get_moves())
 
-    jumps = []
-    for dest, orig in zip(destinations, origins):
-        if board.active == BLACK:
-            rfj = (board.empty >> 8) & (board.pieces[board.passive] >> 4) & dest
-            lfj = (board.empty >> 10) & (board.pieces[board.passive] >> 5) & dest
-            if orig & board.backward[board.active]: # piece is king
-                rbj = (board.empty << 8) & (board.pieces[board.passive] << 4) & dest
-                lbj = (board.empty << 10) & (board.pieces[board.passive] << 5) & dest
-            else:
-                rbj = 0
-                lbj = 0
-        else:
-            rbj = (board.empty << 8) & (board.pieces[board.passive] << 4) & dest
-            lbj = (board.empty << 10) & (board.pieces[board.passive] << 5) & dest
-            if dest & board.forward[board.active]: # piece at square is a king
-                rfj = (board.empty >> 8) & (board.pieces[board.passive] >> 4) & dest
-                lfj = (board.empty >> 10) & (board.pieces[board.passive] >> 5) & dest
-            else:
-                rfj = 0
-                lfj = 0
+def _threats(board, moves):
+    """
+        Returns THRET for board given its list of moves.
+    """
+    active = board.active
+    passive_pieces = board.pieces[board.passive]
+    empty = board.empty
+    rfj = (empty >> 8) & (passive_pieces >> 4)
+    lfj = (empty >> 10) & (passive_pieces >> 5)
+    rbj = (empty << 8) & (passive_pieces << 4)
+    lbj = (empty << 10) & (passive_pieces << 5)
 
-        if (rfj | lfj | rbj | lbj) != 0:
-            jumps += [-0x101 << i for (i, bit) in enumerate(bin(rfj)[::-1]) if bit == '1']
-            jumps += [-0x401 << i for (i, bit) in enumerate(bin(lfj)[::-1]) if bit == '1']
-            jumps += [-0x101 << i - 8 for (i, bit) in enumerate(bin(rbj)[::-1]) if bit == '1']
-            jumps += [-0x401 << i - 10 for (i, bit) in enumerate(bin(lbj)[::-1]) if bit == '1']
+    threats = 0
+    for move in moves:
+        dest = (move ^ board.pieces[active]) & move
+        orig = move ^ dest
+        if active == BLACK:
+            threats += popcount(rfj & dest) + popcount(lfj & dest)
+            if orig & board.backward[active]: # piece is king
+                threats += popcount(rbj & dest) + popcount(lbj & dest)
+        else:
+            threats += popcount(rbj & dest) + popcount(lbj & dest)
+            if dest & board.forward[active]: # piece at square is a king
+                threats += popcount(rfj & dest) + popcount(lfj & dest)
 
-    return len(jumps)
+    return threats
 
 def piece_score_diff(board, player):
-    black_men = bin(board.forward[BLACK]).count("1")
-    black_kings = bin(board.backward[BLACK]).count("1")
+    black_men = popcount(board.forward[BLACK])
+    black_kings = popcount(board.backward[BLACK])
     black_score = 2*black_men + 3*black_kings
-    white_men = bin(board.backward[WHITE]).count("1")
-    white_kings = bin(board.forward[WHITE]).count("1")
+    white_men = popcount(board.backward[WHITE])
+    white_kings = popcount(board.forward[WHITE])
     white_score = 2*white_men + 3*white_kings
 
     return black_score - white_score if player == BLACK else white_score - black_score
@@ -273,25 +327,164 @@ def position_score(board, player):
     i = 1
     total = 0
     for s in scores:
-        total = i*bin(board.pieces[player] & s).count("1")
+        total = i*popcount(board.pieces[player] & s)
         i += 1
     return total
 
+# Fused feature extraction
+
+# Every parameter score() needs from one board. material and position
+# are pairs indexed by player: the piece count (2 for men, and 3 for
+# kings) and position_score() of each side.
+Features = namedtuple('Features', ['over', 'adv', 'back', 'cent', 'cntr', 'deny',
+                                   'kcent', 'mob', 'mov', 'thret',
+                                   'material', 'position'])
+
+# Features of a board whose side to move has no moves; score() looks
+# no further than over.
+GAME_OVER = Features(True, 0, 0, 0, 0, 0, 0, 0, 0, 0, (0, 0), (0, 0))
+
+def features(board):
+    """
+        Returns the Features of board, equal to calling each feature
+        function in turn but computing the direction masks, move list
+        and piece counts they share only once.
+    """
+    moves = board.get_moves()
+    if not moves:
+        return GAME_OVER
+
+    active = board.active
+    passive = board.passive
+    forward = board.forward
+    backward = board.backward
+    active_pieces = board.pieces[active]
+    passive_pieces = board.pieces[passive]
+
+    # Center squares from the black side, also used by CENT and KCENT
+    # as those of a white passive side.
+    if active == BLACK:
+        center_pieces = 0xA619800
+        rows_3_and_4, rows_5_and_6 = 0x3FC0000, 0x1FE00
+        back_row_bridge = 0x480000000
+        active_kings = backward[BLACK]
+        passive_kings = forward[WHITE]
+        move_system = 0x783c1e0f
+    else:
+        center_pieces = 0xCC3280
+        rows_3_and_4, rows_5_and_6 = 0x1FE00, 0x3FC0000
+        back_row_bridge = 0x5
+        active_kings = forward[WHITE]
+        passive_kings = backward[BLACK]
+        move_system = 0x783c1e0f0
+
+    _adv = popcount(rows_5_and_6 & passive_pieces) - popcount(rows_3_and_4 & passive_pieces)
+
+    if active_kings == 0 and back_row_bridge & passive_pieces == back_row_bridge:
+        _back = 1
+    else:
+        _back = 0
+
+    _cent = popcount(passive_pieces & center_pieces)
+    _cntr = popcount(active_pieces & center_pieces) \
+          + popcount(_destinations(moves, active_pieces) & center_pieces)
+    _kcent = popcount(passive_kings & center_pieces)
+
+    rf = board.right_forward()
+    lf = board.left_forward()
+    rb = board.right_backward()
+    lb = board.left_backward()
+    _mob = popcount((rf << 4) | (lf << 5) | (rb >> 4) | (lb >> 5))
+    _deny = _denials(board, rf, lf, rb, lb)
+
+    black_score = 2*popcount(forward[BLACK]) + 3*popcount(backward[BLACK])
+    white_score = 2*popcount(backward[WHITE]) + 3*popcount(forward[WHITE])
+    if white_score < 24 and black_score == white_score and \
+            popcount(move_system & (active_pieces | passive_pieces)) % 2 == 1:
+        _mov = 1
+    else:
+        _mov = 0
+
+    _thret = _threats(board, moves)
+
+    return Features(False, _adv, _back, _cent, _cntr, _deny, _kcent, _mob, _mov, _thret,
+                    (black_score, white_score),
+                    (position_score(board, BLACK), position_score(board, WHITE)))
+
+def evaluate(board):
+    """
+        Returns the Features of board, from the evaluation cache if it
+        has them.
+    """
+    f = _eval_cache.get(board.hash)
+    if f is None:
+        f = features(board)
+        _eval_cache.put(board.hash, f)
+    return f
+
+def is_over(board):
+    """
+        Returns whether the side to move in board has no moves,
+        answered from the evaluation cache when board has been
+        evaluated before. Draws are left to is_drawn().
+    """
+    f = _eval_cache.peek(board.hash)
+    if f is None:
+        return not board.has_moves()
+    return f.over
+
+def is_drawn(board):
+    """
+        Returns whether board repeats an earlier position of the game
+        or has gone board.draw_plies plies without a capture or a man
+        moving. The search scores such positions by drawn_value(),
+        rather than searching round the cycle again.
+    """
+    if board.quiet_plies < 4 or board.jump:
+        return False
+    if board.draw_plies is not None and board.quiet_plies >= board.draw_plies:
+        return True
+    return board.repetitions() > 1
+
+def drawn_value(board, player):
+    """
+        Returns the value to player of board, where is_drawn(board):
+        a draw, 0, unless board has gone board.draw_plies plies and
+        board.adjudicate() gives the game to a side on material, as the
+        game loop does, when it is the end of the game for that side.
+        As in CheckerBoard.outcome(), a position the game loop draws by
+        repetition is a draw first.
+    """
+    if board.adjudication is None or board.draw_plies is None \
+            or board.quiet_plies < board.draw_plies or board.repetitions() >= REPETITIONS:
+        return 0
+    winner = board.adjudicate()
+    if winner is None:
+        return 0
+    return INFINITY if winner == player else -INFINITY
+
 def score(board_old, board_new):
-    if board_old.is_over():
+    return score_features(evaluate(board_old), evaluate(board_new), board_old.active)
+
+def score_features(old, new, player):
+    """
+        Returns the score of the move by player that turned a board
+        with Features old into one with Features new.
+    """
+    if old.over:
         return -INFINITY
-    if board_new.is_over():
+    if new.over:
         return INFINITY
-    _adv   = adv(board_new) - adv(board_old)
-    _back  = adv(board_new) - back(board_old)
-    _cent  = cent(board_new) - cent(board_old)
-    _cntr  = cntr(board_new) - cntr(board_old)
-    _deny  = deny(board_new) - deny(board_old)
-    _kcent = kcent(board_new) - kcent(board_old)
-    _mob   = mob(board_new) - mob(board_old)
+    _adv   = new.adv - old.adv
+    _back  = new.adv - old.back
+    _cent  = new.cent - old.cent
+    _cntr  = new.cntr - old.cntr
+    _deny  = new.deny - old.deny
+    _kcent = new.kcent - old.kcent
+    _mob   = new.mob - old.mob
     _mobil = _mob - _deny
-    _mov   = mov(board_new) - mov(board_old)
-    _thret = thret(board_new) - thret(board_old)
+    _mov   = new.mov - old.mov
+    _thret = new.thret - old.thret
 
     undenied_mobility = 1 if _mobil > 0 else 0
     total_mobility = 1 if _mob > 0 else 0
@@ -317,36 +510,536 @@ def score(board_old, board_new):
                 + _cntr*(2**5)         \
                 + _thret*(2**5)        \
                 + _moc_3*(2**4)        \
-                + piece_score_diff(board_new, board_old.active)*(2**20) \
-                + position_score(board_new, board_old.active)*(2**14)
+                + (new.material[player] - new.material[player ^ 1])*(2**20) \
+                + new.position[player]*(2**14)
 
     return board_score
 
-def negamax(board_old, board_new, depth, alpha, beta, color):
-    if depth == 0 or board_new.is_over():
-        return score(board_old, board_new)*color
+# Search
+class SearchTimeout(Exception):
+    """
+        Raised inside a search when its time budget runs out.
+    """
+
+class Search:
+    def __init__(self, board, table, deadline=None, stats=None):
+        """
+            Holds the state shared by every node of one search from
+            board: the transposition table, the wall-clock deadline (or
+            None), the previous iteration's principal variation, the
+            move orderer, a node count and the SearchStats being
+            collected, if any.
+        """
+        self.table = table
+        self.deadline = deadline
+        self.pv_moves = {}
+        self.orderer = MoveOrderer()
+        self.root_ply = len(board.undo_stack)
+        self.nodes = 0
+        self.stats = stats
+        # Quiescence search, off unless move_function turns it on
+        self.quiescence = False
+        self.qdepth = QUIESCENCE_DEPTH
+        self.qnode_limit = QUIESCENCE_NODES
+        self.qnodes = 0
+        # Quiescence nodes below the leaf being searched
+        self.leaf_qnodes = 0
+        # Whether jump sequences are searched as single composite moves
+        self.composite = False
+        # Whether nodes use principal variation search, and how many
+        # null-window searches failed high and were searched again
+        self.pvs = False
+        self.researches = 0
+        # Selective search, and how many moves it reduced or pruned
+        self.lmr = False
+        self.futility = False
+        self.reductions = 0
+        self.futility_pruned = 0
+        # Endgame tablebase probed at every node, if any, and how many
+        # nodes it decided
+        self.tablebase = None
+        self.tablebase_hits = 0
+
+    def check_time(self):
+        """
+            Raises SearchTimeout if the deadline has passed. The clock is
+            only read every 64 nodes.
+        """
+        if self.deadline is not None and not self.nodes & 63:
+            if time.time() > self.deadline:
+                raise SearchTimeout()
+
+def negamax(board, depth, alpha, beta, search):
+    """
+        Returns the value of board to its side to move, searched to the
+        given depth with alpha-beta pruning.
+
+        The search makes and takes back moves on board in place with
+        push() and pop(), and leaves it as it found it unless it runs
+        out of time. Results of interior nodes are recorded in, and
+        read back from, the transposition table. board must not be
+        drawn by is_drawn(); callers score such boards themselves.
+    """
+    search.nodes += 1
+    search.check_time()
+    stats = search.stats
+
+    alpha_orig = alpha
+    key = board.hash
+    hash_move = None
+    entry = search.table.probe(key)
+    if stats is not None:
+        stats.interior_nodes += 1
+        stats.tt_probes += 1
+        stats.tt_hits += entry is not None
+    if entry is not None:
+        _, tt_depth, flag, value, hash_move, _ = entry
+        if tt_depth >= depth:
+            if flag == EXACT:
+                return value
+            elif flag == LOWER:
+                alpha = max(alpha, value)
+            elif flag == UPPER:
+                beta = min(beta, value)
+            if alpha >= beta:
+                if stats is not None:
+                    stats.tt_cutoffs += 1
+                return value
+
+    # Callers have already scored board by drawn_value() if it is
+    # drawn, so a tablebase result here is not cut short by a
+    # repetition.
+    if search.tablebase is not None:
+        known = search.tablebase.probe(board)
+        if known is not None:
+            search.tablebase_hits += 1
+            return tablebase_value(known, board)
+
+    ply = len(board.undo_stack) - search.root_ply
+    hash_move = search.pv_moves.get(key, hash_move)
+    moves = search.orderer.staged(board, ply, hash_move, search.composite)
+    if stats is not None:
+        moves = stats.timed_moves(moves)
+        clock = time.time
+
+    active = board.active
+    parent = evaluate(board) if depth == 1 else None
+    # The most a quiet move can score at a frontier node, by material
+    futility_value = None
+    if search.futility and depth == 1:
+        futility_value = (parent.material[active] - parent.material[active ^ 1])*(2**20) \
+                       + FUTILITY_MARGIN
+    best_value = -INFINITY
+    best_move = None
+    for (i, move) in enumerate(moves):
+        quiet = move > 0 and not move & PROMOTION_ROWS[active]
+        if quiet and futility_value is not None and futility_value <= alpha:
+            search.futility_pruned += 1
+            best_value = max(best_value, futility_value)
+            continue
+        if stats is not None:
+            start = clock()
+            board.push(move)
+            stats.push_time += clock() - start
+        else:
+            board.push(move)
+        same_side = board.active == active
+        over = is_over(board)
+        drawn = not over and is_drawn(board)
+        reduced = None
+        if search.lmr and quiet and i >= LMR_MOVES and depth >= LMR_DEPTH and not over \
+                and not drawn:
+            search.reductions += 1
+            reduced = -negamax(board, depth - 2, -alpha - 1, -alpha, search)
+        if drawn:
+            val = drawn_value(board, active)
+        elif (depth == 1 and not same_side) or over:
+            # Leaves are scored by the change from this position.
+            if stats is not None:
+                stats.leaf_nodes += 1
+                start = clock()
+            if parent is None:
+                board.pop()
+                parent = evaluate(board)
+                board.push(move)
+            if search.quiescence and not over:
+                val = -quiesce(board, -beta, -alpha, search, parent, active)
+            else:
+                val = score_features(parent, evaluate(board), active)
+            if stats is not None:
+                stats.score_time += clock() - start
+        elif reduced is not None and reduced <= alpha:
+            # A late quiet move that fails low when reduced is left
+            # unsearched at full depth.
+            val = reduced
+        elif search.pvs and i > 0:
+            # A null window shows the move is no better than alpha,
+            # unless it fails high and must be searched again.
+            if same_side:
+                val = negamax(board, depth, alpha, alpha + 1, search)
+            else:
+                val = -negamax(board, depth - 1, -alpha - 1, -alpha, search)
+            if alpha < val < beta:
+                search.researches += 1
+                if same_side:
+                    val = negamax(board, depth, alpha, beta, search)
+                else:
+                    val = -negamax(board, depth - 1, -beta, -alpha, search)
+        elif same_side:
+            val = negamax(board, depth, alpha, beta, search)
+        else:
+            val = -negamax(board, depth - 1, -beta, -alpha, search)
+        if stats is not None:
+            start = clock()
+            board.pop()
+            stats.push_time += clock() - start
+        else:
+            board.pop()
+        if val > best_value:
+            best_value = val
+            best_move = move
+        alpha = max(alpha, val)
+        if alpha >= beta:
+            search.orderer.record_cutoff(move, ply, depth, i)
+            break
+
+    if best_value <= alpha_orig:
+        flag = UPPER
+    elif best_value >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    search.table.store(key, depth, flag, best_value, best_move)
+    return best_value
+
+def tablebase_value(known, board):
+    """
+        Returns the negamax value of a tablebase (result, plies) for
+        board: a win or loss is worth a little less than the end of the
+        game itself, less the further off it is, and a draw is worth 0.
+        So is a win or loss further off than the plies board has left
+        before board.draw_plies ends the game.
+    """
+    (result, plies) = known
+    if board.draw_plies is not None and plies > board.draw_plies - board.quiet_plies:
+        return 0
+    if result == WIN:
+        return INFINITY - plies
+    if result == LOSS:
+        return -INFINITY + plies
+    return 0
+
+def quiesce(board, alpha, beta, search, parent, mover, qdepth=0):
+    """
+        Returns the value of board to its side to move, where board is
+        a leaf reached by a move of mover's from a position with Features
+        parent, following capture moves only until the position is quiet.
+
+        Captures are compulsory, so a side with one cannot stand pat;
+        a side without one stands pat on the score of the change from
+        parent, as the leaf itself would be scored. So does every node
+        past search.qdepth captures or once search.qnode_limit
+        quiescence nodes have been made below the leaf.
+    """
+    if qdepth == 0:
+        search.leaf_qnodes = 0
+    search.qnodes += 1
+    search.leaf_qnodes += 1
+    new = evaluate(board)
+    stand_pat = score_features(parent, new, mover)
+    if board.active != mover:
+        stand_pat = -stand_pat
+    if new.over:
+        return stand_pat
+    moves = board.get_moves(search.composite)
+    if moves[0] > 0 or qdepth >= search.qdepth or search.leaf_qnodes >= search.qnode_limit:
+        return stand_pat
+
+    active = board.active
+    ply = len(board.undo_stack) - search.root_ply
     best_value = -INFINITY
-    for move in board_new.get_moves():
-        B = board_new.peek_move(move)
-        if B.active != board_new.active:
-            val = -negamax(board_new, B, depth - 1, -beta, -alpha, -color)
+    for move in search.orderer.order(moves, ply):
+        board.push(move)
+        if board.active == active:
+            val = quiesce(board, alpha, beta, search, parent, mover, qdepth + 1)
         else:
-            val = negamax(board_new, B, depth, alpha, beta, color)
+            val = -quiesce(board, -beta, -alpha, search, parent, mover, qdepth + 1)
+        board.pop()
         best_value = max(best_value, val)
         alpha = max(alpha, val)
         if alpha >= beta:
             break
     return best_value
 
-def move_function(board, depth=7):
-    def search(move):
-        B = board.peek_move(move)
-        if B.active == board.active:
-            return negamax(board, B, depth, -INFINITY, INFINITY, 1)
+def principal_variation(board, move, table, length):
+    """
+        Returns the line of play starting with move that the
+        transposition table expects, at most length moves long.
+    """
+    pv = [move]
+    seen = set([board.hash])
+    board.push(move)
+    while len(pv) < length and board.hash not in seen:
+        seen.add(board.hash)
+        entry = table.probe(board.hash)
+        if entry is None or entry[4] is None or not board.is_legal(entry[4]):
+            break
+        pv.append(entry[4])
+        board.push(entry[4])
+    for _ in pv:
+        board.pop()
+    return pv
+
+def _unsearched(move, start, info, stats, from_book=False):
+    """
+        Returns move, a move move_function plays without searching,
+        filling in info and stats as for a search of no nodes.
+    """
+    if info is not None:
+        info.update(depth=None, score=None, pv=[move], nodes=0, qnodes=0, researches=0,
+                    reductions=0, futility_pruned=0, tablebase_hits=0, cutoffs=0,
+                    first_move_cutoffs=0, eval_hits=0, eval_misses=0, book=from_book,
+                    time=time.time() - start)
+    if stats is not None:
+        stats.move = move
+        stats.total_time = time.time() - start
+        stats.finish()
+    return move
+
+def move_function(board, depth=7, time_limit=None, table=None, info=None, shuffle=None,
+                  stats=None, quiescence=False, qdepth=QUIESCENCE_DEPTH,
+                  qnodes=QUIESCENCE_NODES, composite=False, mode=ALPHABETA,
+                  lmr=False, futility=False, tablebase=None, book=None,
+                  book_plies=None):
+    """
+        Returns the best move for the side to move in board.
+
+        The search deepens iteratively, to depth 0, 1, 2, ..., trying
+        the previous iteration's principal variation first each time.
+        Without a time_limit it stops after the given depth. With one,
+        in seconds, it keeps deepening up to MAX_DEPTH and returns the
+        best move of the last iteration that finished in time.
+
+        The transposition table defaults to one shared by every call in
+        this process, so consecutive moves of a game reuse each other's
+        work. Pass a TranspositionTable to keep a search separate.
+
+        If info is a dict, it is filled in with the depth reached, the
+        score and principal variation of the move returned, the number
+        of nodes searched, the number of beta cutoffs and how many of
+        them the first move searched caused, the evaluation cache hits
+        and misses, and the time taken.
+
+        If shuffle is a random.Random, the root moves are searched in an
+        order it chooses rather than get_moves() order. Parallel helper
+        searches use this so that they do not all repeat the same work.
+
+        If stats is a SearchStats, it is reset and then filled in with
+        counts and timings of this search, and its recorder called.
+        Without it the search pays for no instrumentation.
+
+        With quiescence, leaves where captures are pending are searched
+        on through the captures; see quiesce(). qdepth and qnodes limit
+        the captures followed and the nodes searched below each leaf.
+
+        With composite, the search treats each whole jump sequence as
+        one move (see CheckerBoard.composite_jumps). The first jump of
+        the chosen sequence is returned as usual, and the following
+        calls return the rest of it without searching again.
+
+        mode is ALPHABETA, PVS or ASPIRATION. Under ALPHABETA the first
+        move in get_moves() order wins ties; under the others, the
+        first searched.
+
+        lmr turns on late move reductions and futility on futility
+        pruning (see LMR_MOVES and FUTILITY_MARGIN). Both trade some
+        accuracy for fewer nodes.
+
+        tablebase is a Tablebase, or the directory of one, probed at
+        every node of the search; positions it has a table for are not
+        searched any further.
+
+        book is a Book, or the file of one. When it has a move for
+        board, that move is returned at once without searching, and
+        info and stats show a search of no nodes with info['book'] set.
+        With book_plies, the book is only used while board's undo stack
+        holds fewer than book_plies moves.
+
+        board may also be a Position, which is searched through a
+        PositionLine (see position.py).
+    """
+    if isinstance(board, Position):
+        board = PositionLine(board)
+    if mode not in (ALPHABETA, PVS, ASPIRATION):
+        raise ValueError("Unknown search mode: %r" % (mode,))
+    start = time.time()
+    if table is None:
+        table = _table
+    table.new_search()
+    if stats is not None:
+        stats.reset()
+    # The next jump of a composite move chosen by an earlier call is
+    # played without searching again.
+    pending = _pending_hops.pop(board.hash, None)
+    if pending is not None and board.is_legal(pending):
+        return _unsearched(pending, start, info, stats)
+    if book is not None and (book_plies is None or len(board.undo_stack) < book_plies):
+        if isinstance(book, str):
+            if book not in _books:
+                _books[book] = Book(book)
+            book = _books[book]
+        move = book.choose(board)
+        if move is not None and board.is_legal(move):
+            _pending_hops.clear()
+            return _unsearched(move, start, info, stats, from_book=True)
+    if time_limit is None:
+        search = Search(board, table, None, stats)
+        max_depth = depth
+    else:
+        search = Search(board, table, start + time_limit, stats)
+        max_depth = MAX_DEPTH
+    search.quiescence = quiescence
+    search.qdepth = qdepth
+    search.qnode_limit = qnodes
+    search.composite = composite
+    search.pvs = mode != ALPHABETA
+    search.lmr = lmr
+    search.futility = futility
+    if isinstance(tablebase, str):
+        if tablebase not in _tablebases:
+            _tablebases[tablebase] = Tablebase(tablebase)
+        tablebase = _tablebases[tablebase]
+    search.tablebase = tablebase
+
+    moves = board.get_moves(composite)
+    # The search plays its moves on board itself and takes them back,
+    # so board is only read here, never copied.
+    root_active = board.active
+    root_features = evaluate(board)
+    eval_hits, eval_misses = _eval_cache.hits, _eval_cache.misses
+    best_move, best_value, pv, reached = moves[0], None, [moves[0]], None
+    order = list(moves)
+    if shuffle is not None:
+        shuffle.shuffle(order)
+
+    def value(move, d, alpha=-INFINITY, beta=INFINITY):
+        board.push(move)
+        over = is_over(board)
+        if not over and is_drawn(board):
+            val = drawn_value(board, root_active)
+        elif d == 0 or over:
+            if stats is not None:
+                stats.leaf_nodes += 1
+            if quiescence and not over:
+                if board.active == root_active:
+                    val = quiesce(board, alpha, beta, search, root_features, root_active)
+                else:
+                    val = -quiesce(board, -beta, -alpha, search, root_features, root_active)
+            else:
+                val = score_features(root_features, evaluate(board), root_active)
+        elif board.active == root_active:
+            val = negamax(board, d, alpha, beta, search)
         else:
-            return negamax(board, B, depth, -INFINITY, INFINITY, -1)
+            val = -negamax(board, d, -beta, -alpha, search)
+        board.pop()
+        return val
+
+    def search_root(d, alpha, beta):
+        # Returns the best move and its value, searched to depth d.
+        first = [best_move] + [m for m in order if m != best_move]
+        if mode == ALPHABETA:
+            values = {}
+            for m in first:
+                values[m] = value(m, d)
+            # Of equally good moves, the first in get_moves() order wins.
+            m = max(moves, key=values.get)
+            return (m, values[m])
+        (best, best_val) = (None, -INFINITY)
+        for (i, m) in enumerate(first):
+            if i == 0:
+                val = value(m, d, alpha, beta)
+            else:
+                val = value(m, d, alpha, alpha + 1)
+                if alpha < val < beta:
+                    search.researches += 1
+                    val = value(m, d, alpha, beta)
+            if best is None or val > best_val:
+                (best, best_val) = (m, val)
+            alpha = max(alpha, val)
+            if alpha >= beta:
+                break
+        return (best, best_val)
+
+    # With a single legal move there is nothing to search.
+    for d in range(max_depth + 1 if len(moves) > 1 else 0):
+        (alpha, beta) = (-INFINITY, INFINITY)
+        if mode == ASPIRATION and best_value is not None and abs(best_value) < INFINITY:
+            (alpha, beta) = (best_value - ASPIRATION_WINDOW, best_value + ASPIRATION_WINDOW)
+        try:
+            while True:
+                (m, val) = search_root(d, alpha, beta)
+                if val <= alpha and alpha > -INFINITY:
+                    alpha = -INFINITY
+                elif val >= beta and beta < INFINITY:
+                    beta = INFINITY
+                else:
+                    break
+                search.researches += 1
+        except SearchTimeout:
+            # Take back whatever the interrupted search left on the board.
+            while len(board.undo_stack) > search.root_ply:
+                board.pop()
+            break
+        (best_move, best_value) = (m, val)
+        reached = d
+        pv = principal_variation(board, best_move, table, d + 2)
+        search.pv_moves = {}
+        for m in pv:
+            search.pv_moves[board.hash] = m
+            board.push(m)
+        for m in pv:
+            board.pop()
+
+    # Play a composite move one jump at a time, leaving the rest of it
+    # for the next calls.
+    hops = board.hops(best_move)
+    _pending_hops.clear()
+    for (hop, following) in zip(hops, hops[1:]):
+        board.push(hop)
+        _pending_hops[board.hash] = following
+    for _ in hops[1:]:
+        board.pop()
 
-    return max(board.get_moves(), key=search)
+    if info is not None:
+        info['depth'] = reached
+        info['score'] = best_value
+        info['pv'] = pv
+        info['nodes'] = search.nodes
+        info['qnodes'] = search.qnodes
+        info['researches'] = search.researches
+        info['reductions'] = search.reductions
+        info['futility_pruned'] = search.futility_pruned
+        info['tablebase_hits'] = search.tablebase_hits
+        info['book'] = False
+        info['cutoffs'] = search.orderer.cutoffs
+        info['first_move_cutoffs'] = search.orderer.first_move_cutoffs
+        info['eval_hits'] = _eval_cache.hits - eval_hits
+        info['eval_misses'] = _eval_cache.misses - eval_misses
+        info['time'] = time.time() - start
+    if stats is not None:
+        stats.move = hops[0]
+        stats.score = best_value
+        stats.depth = reached
+        stats.quiescence_nodes = search.qnodes
+        stats.reductions = search.reductions
+        stats.futility_pruned = search.futility_pruned
+        stats.cutoffs = search.orderer.cutoffs
+        stats.first_move_cutoffs = search.orderer.first_move_cutoffs
+        stats.eval_hits = _eval_cache.hits - eval_hits
+        stats.eval_misses = _eval_cache.misses - eval_misses
+        stats.total_time = time.time() - start
+        stats.finish()
+    return hops[0]
     #pairs = zip(zip(board.get_moves(), get_move_strings(board)),
                 #map(search, board.get_moves()))
     #print "Moves and ratings"
@@ -0,0 +1,557 @@
+"""
+    This module implements the engine benchmarks.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Benchmarks for the checkers engine. Each subcommand times one part
+# of it and prints its throughput, e.g.
+#
+#     python bench.py push --depth 5 --plies 40
+#     python bench.py smp --depth 6 --workers 1 2 4 8
+#     python bench.py eval --save eval-baseline.json
+#     python bench.py quiescence --depth 5
+#     python bench.py search --depth 6
+#     python bench.py pruning --depth 6
+#     python bench.py pack
+#     python bench.py position --depth 5
+#
+# Created October 18, 2026
+
+import argparse
+import json
+import pickle
+import random
+import sys
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import arthur
+import checkers
+import corpus
+import parallel
+from position import Position, PositionLine
+from transposition import SharedTranspositionTable, TranspositionTable
+
+### BENCHMARKS
+
+def walk_copy(board, depth):
+    """
+        Visits every position up to depth moves ahead of board by
+        copying it with peek_move, and returns how many it saw.
+    """
+    if depth == 0:
+        return 1
+    nodes = 1
+    for move in board.get_moves():
+        nodes += walk_copy(board.peek_move(move), depth - 1)
+    return nodes
+
+def walk_push(board, depth):
+    """
+        Visits the same positions as walk_copy, making and taking back
+        moves on board in place with push and pop.
+    """
+    if depth == 0:
+        return 1
+    nodes = 1
+    for move in board.get_moves():
+        board.push(move)
+        nodes += walk_push(board, depth - 1)
+        board.pop()
+    return nodes
+
+def walk_position(position, depth):
+    """
+        Visits the same positions as walk_copy, making each move on an
+        immutable Position.
+    """
+    if depth == 0:
+        return 1
+    nodes = 1
+    for move in position.get_moves():
+        nodes += walk_position(position.make_move(move), depth - 1)
+    return nodes
+
+def bench_push(args):
+    """
+        Compares the nodes/sec of the copy path against push/pop, from
+        the position after args.plies random moves, so that the board
+        carries that much history.
+    """
+    rng = random.Random(args.seed)
+    moves = []
+    B = checkers.CheckerBoard()
+    while len(moves) < args.plies and not B.is_over():
+        moves.append(rng.choice(B.get_moves()))
+        B.push(moves[-1])
+    print("%i plies of history, %i since the last capture or man move"
+          % (len(B.undo_stack), B.quiet_plies))
+    rates = {}
+    for (name, walk) in (("peek_move", walk_copy), ("push/pop", walk_push)):
+        B = checkers.CheckerBoard()
+        for move in moves:
+            B.push(move)
+        start = time.time()
+        nodes = walk(B, args.depth)
+        elapsed = time.time() - start
+        rates[name] = nodes / elapsed
+        print("%-10s %9i nodes %8.3fs %10.0f nodes/sec" % (name, nodes, elapsed, rates[name]))
+    print("push/pop speed-up: %.2fx" % (rates["push/pop"] / rates["peek_move"]))
+
+def bench_smp(args):
+    """
+        Times parallel searches to a fixed depth over a set of corpus
+        positions with each number of workers, and prints the speed-up
+        over one worker.
+    """
+    boards = corpus.positions(args.positions, args.seed)
+    base = None
+    for workers in args.workers:
+        elapsed = 0.0
+        nodes = 0
+        for B in boards:
+            table = SharedTranspositionTable()
+            arthur._eval_cache.clear()
+            info = {}
+            start = time.time()
+            parallel.move_function(B, args.depth, workers=workers, table=table, info=info)
+            elapsed += time.time() - start
+            nodes += info['total_nodes']
+        if base is None:
+            base = elapsed
+        print("%3i workers %9i nodes %8.3fs %6.2fx" % (workers, nodes, elapsed, base / elapsed))
+
+# Printed where a benchmark cannot trace memory
+NO_TRACEMALLOC = "peak bytes not measured: tracemalloc needs Python 3.4 or later"
+
+# The evaluation terms timed by bench_eval, each called as f(board)
+EVAL_FUNCTIONS = [
+    ('adv', arthur.adv),
+    ('back', arthur.back),
+    ('cent', arthur.cent),
+    ('cntr', arthur.cntr),
+    ('deny', arthur.deny),
+    ('kcent', arthur.kcent),
+    ('mob', arthur.mob),
+    ('mobil', arthur.mobil),
+    ('mov', arthur.mov),
+    ('thret', arthur.thret),
+    ('piece_score_diff', lambda B: arthur.piece_score_diff(B, B.active)),
+    ('position_score', lambda B: arthur.position_score(B, B.active)),
+    ('features', arthur.features),
+]
+
+def _fresh(boards):
+    """
+        Returns copies of boards without their cached move lists, so
+        that every timed call pays for move generation.
+    """
+    copies = []
+    for B in boards:
+        C = B.copy()
+        C._moves = None
+        C._has_moves = None
+        copies.append(C)
+    return copies
+
+def _time_calls(f, args, repeat):
+    """
+        Returns the best over repeat runs of the mean nanoseconds per
+        call of f(*a) for a in args. args is a function returning a
+        fresh list of argument tuples for each run.
+    """
+    best = None
+    for _ in range(repeat):
+        calls = args()
+        start = time.time()
+        for a in calls:
+            f(*a)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1e9 / len(calls)
+
+def _peak_bytes(f, calls):
+    """
+        Returns the mean, over a in calls, of the most memory traced at
+        once during a call of f(*a), above what was traced before it,
+        or None without tracemalloc. This is peak bytes, not a count of
+        allocations: memory freed and allocated again within the call
+        is only counted once.
+    """
+    if tracemalloc is None:
+        return None
+    total = 0
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.start()
+        for a in calls:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            f(*a)
+            total += tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    else:
+        # Before Python 3.9 the peak is only reset by tracing afresh.
+        for a in calls:
+            tracemalloc.start()
+            f(*a)
+            total += tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return float(total) / len(calls)
+
+def _score(old, new):
+    """
+        arthur.score without the evaluation cache, as at a new leaf.
+    """
+    return arthur.score_features(arthur.features(old), arthur.features(new), old.active)
+
+def bench_eval(args):
+    """
+        Times every evaluation term and arthur.score over a corpus of
+        positions, and compares the results with a saved baseline.
+    """
+    if args.corpus:
+        boards = corpus.cached_positions(args.corpus, args.positions, args.seed)
+    else:
+        boards = corpus.positions(args.positions, args.seed)
+    boards = [B for B in boards if not B.is_over()]
+    pairs = []
+    for B in boards:
+        child = B.copy()
+        child.push(B.get_moves()[0])
+        child.undo_stack = []
+        pairs.append((B, child))
+
+    cases = [(name, f, lambda: [(B,) for B in _fresh(boards)]) for (name, f) in EVAL_FUNCTIONS]
+    cases.append(('score', _score,
+                  lambda: list(zip(_fresh([p[0] for p in pairs]), _fresh([p[1] for p in pairs])))))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = {}
+    regressions = []
+    print("%i positions, best of %i runs" % (len(boards), args.repeat))
+    if tracemalloc is None:
+        print(NO_TRACEMALLOC)
+    print("%-18s %12s %14s %10s" % ("", "ns/call", "peak bytes", "baseline"))
+    for (name, f, make_args) in cases:
+        ns = _time_calls(f, make_args, args.repeat)
+        peak = _peak_bytes(f, make_args()[:args.alloc_positions])
+        results[name] = ns
+        line = "%-18s %12.0f %14s" % (name, ns, "n/a" if peak is None else "%.0f" % peak)
+        if name in baseline:
+            ratio = ns / baseline[name]
+            line += " %9.2fx" % ratio
+            if ratio > 1 + args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if regressions:
+        print("slower than baseline by more than %i%%: %s"
+              % (100 * args.threshold, ", ".join(regressions)))
+        return 1
+    return 0
+
+def bench_quiescence(args):
+    """
+        Searches corpus positions to depth with and without quiescence
+        and to depth + 2 without, and prints how often each shallow
+        search picks the deeper search's move and what it costs.
+    """
+    boards = [B for B in corpus.positions(args.positions * 3, args.seed)
+              if not B.is_over() and len(B.get_moves()) > 1][:args.positions]
+    configs = [("depth %i" % args.depth, dict(depth=args.depth)),
+               ("depth %i + quiescence" % args.depth, dict(depth=args.depth, quiescence=True)),
+               ("depth %i" % (args.depth + 2), dict(depth=args.depth + 2))]
+    chosen = {}
+    for (name, kwargs) in configs:
+        arthur._eval_cache.clear()
+        moves = []
+        nodes = 0
+        start = time.time()
+        for B in boards:
+            info = {}
+            moves.append(arthur.move_function(B, table=TranspositionTable(), info=info, **kwargs))
+            nodes += info['nodes'] + info['qnodes']
+        chosen[name] = (moves, nodes, time.time() - start)
+    reference = chosen[configs[-1][0]][0]
+    print("%i positions" % len(boards))
+    for (name, _) in configs:
+        (moves, nodes, elapsed) = chosen[name]
+        agree = sum(1 for (m, r) in zip(moves, reference) if m == r)
+        print("%-24s %10i nodes %8.2fs  %5.1f%% same move as depth %i"
+              % (name, nodes, elapsed, 100.0 * agree / len(boards), args.depth + 2))
+
+def bench_search(args):
+    """
+        Searches corpus positions in every search mode and prints the
+        nodes and time each takes and how often it picks the move plain
+        alpha-beta does.
+    """
+    boards = [B for B in corpus.positions(args.positions * 3, args.seed)
+              if not B.is_over() and len(B.get_moves()) > 1][:args.positions]
+    reference = None
+    print("%i positions, depth %i" % (len(boards), args.depth))
+    for mode in (arthur.ALPHABETA, arthur.PVS, arthur.ASPIRATION):
+        arthur._eval_cache.clear()
+        moves = []
+        nodes = 0
+        researches = 0
+        start = time.time()
+        for B in boards:
+            info = {}
+            moves.append(arthur.move_function(B, args.depth, table=TranspositionTable(),
+                                              info=info, mode=mode))
+            nodes += info['nodes']
+            researches += info['researches']
+        elapsed = time.time() - start
+        if reference is None:
+            reference = moves
+            base = nodes
+        agree = sum(1 for (m, r) in zip(moves, reference) if m == r)
+        print("%-12s %10i nodes (%5.1f%%) %8.2fs %6i re-searches  %5.1f%% same move"
+              % (mode, nodes, 100.0 * nodes / base, elapsed, researches,
+                 100.0 * agree / len(boards)))
+
+def tactical(board):
+    """
+        Returns whether board is tactical: the side to move must jump,
+        or has a move after which the other side can.
+    """
+    moves = board.get_moves()
+    if moves[0] < 0:
+        return True
+    for move in moves:
+        board.push(move)
+        threatened = bool(board.get_jumps())
+        board.pop()
+        if threatened:
+            return True
+    return False
+
+def bench_pruning(args):
+    """
+        Searches tactical corpus positions with and without late move
+        reductions and futility pruning, and prints the nodes and time
+        each takes and how often it picks the unpruned search's move.
+    """
+    boards = [B for B in corpus.positions(args.positions * 5, args.seed)
+              if not B.is_over() and len(B.get_moves()) > 1 and tactical(B)][:args.positions]
+    configs = [("unpruned", dict()),
+               ("lmr", dict(lmr=True)),
+               ("futility", dict(futility=True)),
+               ("lmr + futility", dict(lmr=True, futility=True))]
+    reference = None
+    print("%i tactical positions, depth %i" % (len(boards), args.depth))
+    for (name, kwargs) in configs:
+        arthur._eval_cache.clear()
+        moves = []
+        nodes = 0
+        pruned = 0
+        start = time.time()
+        for B in boards:
+            info = {}
+            moves.append(arthur.move_function(B, args.depth, table=TranspositionTable(),
+                                              info=info, **kwargs))
+            nodes += info['nodes']
+            pruned += info['reductions'] + info['futility_pruned']
+        elapsed = time.time() - start
+        if reference is None:
+            reference = moves
+            base = nodes
+        agree = sum(1 for (m, r) in zip(moves, reference) if m == r)
+        print("%-16s %10i nodes (%5.1f%%) %8.2fs %7i reduced/pruned  %5.1f%% same move"
+              % (name, nodes, 100.0 * nodes / base, elapsed, pruned,
+                 100.0 * agree / len(boards)))
+
+def bench_pack(args):
+    """
+        Times turning corpus positions into each serialised form and
+        back, against pickling the boards and copying them, and prints
+        the size of each form.
+    """
+    boards = corpus.positions(args.positions, args.seed)
+    forms = [
+        ("pickle", lambda B: pickle.dumps(B, pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ("to_bytes", lambda B: B.to_bytes(), checkers.from_bytes),
+        ("pack", lambda B: B.pack(), checkers.unpack),
+        ("fen", lambda B: B.fen(), checkers.board_from_fen),
+    ]
+    n = len(boards)
+    start = time.time()
+    for B in boards:
+        B.copy()
+    print("%i positions" % n)
+    print("%-10s %8.2f us to copy" % ("copy", 1e6 * (time.time() - start) / n))
+    for (name, encode, decode) in forms:
+        start = time.time()
+        encoded = [encode(B) for B in boards]
+        encode_time = time.time() - start
+        start = time.time()
+        for e in encoded:
+            decode(e)
+        decode_time = time.time() - start
+        if name == "pack":
+            size = sum((e.bit_length() + 7) // 8 for e in encoded)
+        else:
+            size = sum(len(e) for e in encoded)
+        print("%-10s %8.2f us to encode %8.2f us to decode %8.1f bytes"
+              % (name, 1e6 * encode_time / n, 1e6 * decode_time / n, float(size) / n))
+
+def _footprint(state):
+    """
+        Returns the bytes held by a board or Position: the object, its
+        attribute dict and the lists and tuples it holds directly. The
+        ints in them are left out, as they are much the same for both.
+    """
+    size = sys.getsizeof(state)
+    fields = state if isinstance(state, tuple) else list(state.__dict__.values())
+    if not isinstance(state, tuple):
+        size += sys.getsizeof(state.__dict__)
+    for field in fields:
+        if isinstance(field, (list, tuple)):
+            size += sys.getsizeof(field)
+    return size
+
+def bench_position(args):
+    """
+        Compares immutable Positions with CheckerBoards: the nodes/sec
+        of walking the game tree, the peak bytes traced making one move
+        (with tracemalloc), the bytes one position holds, and arthur's
+        time and move searching corpus positions given as each.
+    """
+    walks = [("push/pop", walk_push, checkers.CheckerBoard()),
+             ("peek_move", walk_copy, checkers.CheckerBoard()),
+             ("Position", walk_position, Position.start()),
+             ("PositionLine", walk_push, PositionLine(Position.start()))]
+    for (name, walk, start_state) in walks:
+        start = time.time()
+        nodes = walk(start_state, args.depth)
+        elapsed = time.time() - start
+        print("%-13s %9i nodes %8.3fs %10.0f nodes/sec" % (name, nodes, elapsed, nodes / elapsed))
+
+    boards = [B for B in corpus.positions(args.positions, args.seed) if not B.is_over()]
+    positions = [Position.from_board(B) for B in boards]
+    lines = [PositionLine(P) for P in positions]
+
+    def push_pop(board, move):
+        board.push(move)
+        board.pop()
+
+    makes = [("push/pop", push_pop, boards),
+             ("peek_move", lambda B, m: B.peek_move(m), boards),
+             ("Position", lambda P, m: P.make_move(m), positions),
+             ("PositionLine", push_pop, lines)]
+    print("%i positions" % len(boards))
+    if tracemalloc is None:
+        print(NO_TRACEMALLOC)
+    for (name, make, states) in makes:
+        calls = [(state, state.get_moves()[0]) for state in states]
+        peak = _peak_bytes(make, calls)
+        print("%-13s %10s peak bytes per move" % (name, "n/a" if peak is None else "%.0f" % peak))
+    print("%-13s %10.0f bytes per position"
+          % ("CheckerBoard", float(sum(_footprint(B) for B in boards)) / len(boards)))
+    print("%-13s %10.0f bytes per position"
+          % ("Position", float(sum(_footprint(P) for P in positions)) / len(positions)))
+
+    searched = [B for B in boards if len(B.get_moves()) > 1][:args.searches]
+    reference = None
+    for (name, states) in (("CheckerBoard", searched),
+                           ("Position", [Position.from_board(B) for B in searched])):
+        arthur._eval_cache.clear()
+        moves = []
+        nodes = 0
+        start = time.time()
+        for state in states:
+            arthur._pending_hops.clear()
+            info = {}
+            moves.append(arthur.move_function(state, args.search_depth,
+                                              table=TranspositionTable(), info=info))
+            nodes += info['nodes']
+        elapsed = time.time() - start
+        if reference is None:
+            reference = moves
+        agree = sum(1 for (m, r) in zip(moves, reference) if m == r)
+        print("%-13s %10i nodes %8.2fs %10.0f nodes/sec  %5.1f%% same move"
+              % (name, nodes, elapsed, nodes / elapsed, 100.0 * agree / len(states)))
+
+### MAIN
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checkers engine benchmarks.")
+    commands = parser.add_subparsers()
+
+    push = commands.add_parser("push", help="make/unmake versus copying boards")
+    push.add_argument("--depth", type=int, default=5)
+    push.add_argument("--plies", type=int, default=0,
+                      help="random moves played before the walk")
+    push.add_argument("--seed", type=int, default=0)
+    push.set_defaults(run=bench_push)
+
+    smp = commands.add_parser("smp", help="parallel search speed-up versus worker count")
+    smp.add_argument("--depth", type=int, default=6)
+    smp.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    smp.add_argument("--positions", type=int, default=10)
+    smp.add_argument("--seed", type=int, default=0)
+    smp.set_defaults(run=bench_smp)
+
+    ev = commands.add_parser("eval", help="ns/call and peak bytes of the evaluation terms")
+    ev.add_argument("--positions", type=int, default=3000)
+    ev.add_argument("--seed", type=int, default=0)
+    ev.add_argument("--corpus", help="pickle file caching the positions")
+    ev.add_argument("--repeat", type=int, default=5)
+    ev.add_argument("--alloc-positions", type=int, default=200,
+                    help="positions traced for peak bytes (tracemalloc is slow)")
+    ev.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    ev.add_argument("--threshold", type=float, default=0.10,
+                    help="fractional slow-down that counts as a regression")
+    ev.add_argument("--save", help="write the results as JSON for use as a baseline")
+    ev.set_defaults(run=bench_eval)
+
+    quiescence = commands.add_parser("quiescence",
+                                     help="quiescence search versus two more plies")
+    quiescence.add_argument("--depth", type=int, default=5)
+    quiescence.add_argument("--positions", type=int, default=100)
+    quiescence.add_argument("--seed", type=int, default=0)
+    quiescence.set_defaults(run=bench_quiescence)
+
+    search = commands.add_parser("search", help="node counts of the search modes")
+    search.add_argument("--depth", type=int, default=6)
+    search.add_argument("--positions", type=int, default=30)
+    search.add_argument("--seed", type=int, default=0)
+    search.set_defaults(run=bench_search)
+
+    pruning = commands.add_parser("pruning",
+                                  help="selective search versus full width on tactical positions")
+    pruning.add_argument("--depth", type=int, default=6)
+    pruning.add_argument("--positions", type=int, default=30)
+    pruning.add_argument("--seed", type=int, default=0)
+    pruning.set_defaults(run=bench_pruning)
+
+    pack = commands.add_parser("pack", help="packed and FEN positions versus pickled boards")
+    pack.add_argument("--positions", type=int, default=2000)
+    pack.add_argument("--seed", type=int, default=0)
+    pack.set_defaults(run=bench_pack)
+
+    position = commands.add_parser("position", help="immutable Positions versus CheckerBoards")
+    position.add_argument("--depth", type=int, default=5)
+    position.add_argument("--positions", type=int, default=2000)
+    position.add_argument("--searches", type=int, default=20)
+    position.add_argument("--search-depth", type=int, default=5)
+    position.add_argument("--seed", type=int, default=0)
+    position.set_defaults(run=bench_position)
+
+    args = parser.parse_args(argv)
+    return args.run(args) or 0
+
+if __name__ == '__main__':
+    sys.exit(main())
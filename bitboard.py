@@ -0,0 +1,109 @@
+"""
+    This module defines lookup tables for the 36-bit board layout.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Bit tricks and precomputed tables for Samuel's 36-bit board, so
+# that move generation and evaluation never go through bin().
+#
+# Squares are single-bit integers. Moving right is a shift by 4 and
+# moving left a shift by 5; jumps shift by 8 and 10. Bits 8, 17, 26
+# and 35 are never used, so a shift that would leave the board lands
+# on one of them or outside the 36 bits.
+#
+# Created October 18, 2026
+
+### CONSTANTS
+
+UNUSED_BITS = 0b100000000100000000100000000100000000
+VALID_SQUARES = (2**36 - 1) ^ UNUSED_BITS
+
+# Every square, in increasing bit order
+SQUARES = [1 << i for i in range(36) if (VALID_SQUARES >> i) & 1]
+
+# Bit index of every single-bit integer; with x & -x this gives the
+# index of the lowest set bit of x.
+BIT_INDEX = dict((1 << i, i) for i in range(48))
+
+# Number of set bits in every 16-bit integer
+_POPCOUNT_16 = [0] * (1 << 16)
+for _i in range(1, 1 << 16):
+    _POPCOUNT_16[_i] = _POPCOUNT_16[_i >> 1] + (_i & 1)
+
+# Every 12-bit integer with its bits in reverse order
+_REVERSE_12 = [0] * (1 << 12)
+for _i in range(1, 1 << 12):
+    _REVERSE_12[_i] = (_REVERSE_12[_i >> 1] >> 1) | ((_i & 1) << 11)
+
+def _neighbour(square, shift):
+    target = square << shift if shift > 0 else square >> -shift
+    return target & VALID_SQUARES
+
+# The square reached from each square by a normal move in each
+# direction, or 0 if it is off the board.
+RIGHT_FORWARD = dict((sq, _neighbour(sq, 4)) for sq in SQUARES)
+LEFT_FORWARD = dict((sq, _neighbour(sq, 5)) for sq in SQUARES)
+RIGHT_BACKWARD = dict((sq, _neighbour(sq, -4)) for sq in SQUARES)
+LEFT_BACKWARD = dict((sq, _neighbour(sq, -5)) for sq in SQUARES)
+
+# The landing square of a jump from each square in each direction, or
+# 0 if either the jumped or the landing square is off the board.
+RIGHT_FORWARD_JUMP = dict((sq, _neighbour(RIGHT_FORWARD[sq], 4)) for sq in SQUARES)
+LEFT_FORWARD_JUMP = dict((sq, _neighbour(LEFT_FORWARD[sq], 5)) for sq in SQUARES)
+RIGHT_BACKWARD_JUMP = dict((sq, _neighbour(RIGHT_BACKWARD[sq], -4)) for sq in SQUARES)
+LEFT_BACKWARD_JUMP = dict((sq, _neighbour(LEFT_BACKWARD[sq], -5)) for sq in SQUARES)
+
+# The square captured by every jump, keyed by the jump's (positive)
+# move integer: the origin and landing bits.
+CAPTURED = {}
+for _sq in SQUARES:
+    for (_step, _jumps) in ((RIGHT_FORWARD, RIGHT_FORWARD_JUMP),
+                            (LEFT_FORWARD, LEFT_FORWARD_JUMP),
+                            (RIGHT_BACKWARD, RIGHT_BACKWARD_JUMP),
+                            (LEFT_BACKWARD, LEFT_BACKWARD_JUMP)):
+        if _jumps[_sq]:
+            CAPTURED[_sq | _jumps[_sq]] = _step[_sq]
+
+### FUNCTIONS
+
+def popcount(x):
+    """
+        Returns the number of set bits in x, which must be a
+        non-negative integer below 2**48.
+    """
+    return _POPCOUNT_16[x & 0xffff] + _POPCOUNT_16[(x >> 16) & 0xffff] + _POPCOUNT_16[x >> 32]
+
+def bits(x):
+    """
+        Returns the set bits of x as a list of single-bit integers, in
+        increasing order.
+    """
+    result = []
+    while x:
+        b = x & -x
+        result.append(b)
+        x ^= b
+    return result
+
+def flip(x):
+    """
+        Returns the bitboard x turned through 180 degrees: bit i moves
+        to bit 34 - i, so square s goes to square 33 - s and the unused
+        bits stay unused.
+    """
+    return (_REVERSE_12[x & 0xfff] << 23) | (_REVERSE_12[(x >> 12) & 0xfff] << 11) \
+         | (_REVERSE_12[x >> 24] >> 1)
+
+def compress(x):
+    """
+        Returns the bitboard x with the unused bits squeezed out: bit
+        s - 1 of the result is square s, for squares 1 to 32.
+    """
+    return (x & 0xff) | (x >> 1 & 0xff00) | (x >> 2 & 0xff0000) | (x >> 3 & 0xff000000)
+
+def expand(x):
+    """
+        Returns the bitboard of the 32-bit square set x, undoing
+        compress().
+    """
+    return (x & 0xff) | (x & 0xff00) << 1 | (x & 0xff0000) << 2 | (x & 0xff000000) << 3
@@ -0,0 +1,329 @@
+"""
+    This module defines the Book class and the opening book builder.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# An opening book: for positions from the first plies of played
+# games, every move made there and how many of those games the side
+# making it won, drew and lost. Books are built from tournament.py
+# records or from a PDN file of games, e.g.
+#
+#     python tournament.py arthur:depth=6 arthur:depth=6 --opening-plies 4 --games 500
+#     python book.py build --tournament tournament.jsonl --plies 16
+#     python book.py build --pdn games.pdn --output master.bin
+#     python book.py show --moves 11-15 23-19
+#
+# Pass book= a Book or the file of one to arthur's move_function to
+# have it play a book move, chosen at random weighted by the points
+# it scored, without searching, and book_plies= to stop using the book
+# that many plies into the game.
+#
+# The file is a header followed by one fixed-size record per
+# (position, move), sorted by the position's Zobrist hash, so a probe
+# is a binary search over the memory-mapped file and never reads the
+# whole book. Moves are single moves as get_moves() lists them, so
+# the positions in the middle of a multi-jump are in the book too.
+#
+# Created October 18, 2026
+
+import argparse
+import json
+import mmap
+import random
+import re
+import struct
+import sys
+import time
+
+from bitboard import BIT_INDEX
+from checkers import BLACK, WHITE, CheckerBoard, VALID_MOVE_BITS
+
+### CONSTANTS
+
+# Where books are written and read by default
+BOOK_FILE = 'book.bin'
+
+# Plies of each game that go into the book by default
+BOOK_PLIES = 16
+
+# Header: magic, version, number of records, plies per game
+MAGIC = b'CKBK'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')
+
+# Record: position hash, move, wins, draws and losses of the side
+# making the move, and the earliest ply the position was reached at
+ENTRY = struct.Struct('<QqIIIH')
+KEY = struct.Struct('<Q')
+
+# PDN results, scored first for Black, the side that moves first, on
+# either the 1 or the 2 point scale
+RESULTS = {'1-0': BLACK, '2-0': BLACK, '0-1': WHITE, '0-2': WHITE,
+           '1/2-1/2': None, '1-1': None}
+
+_PDN_TOKEN = re.compile(r'\[\s*(\w+)\s+"([^"]*)"\s*\]|\{[^}]*\}|\([^)]*\)|(\S+)')
+_PDN_MOVE = re.compile(r'^(?:\d+\.+)?(\d+(?:[-x]\d+)+)$')
+
+### FUNCTIONS
+
+def square(bit):
+    """
+        Returns the square, 1 to 32, of a bitboard bit.
+    """
+    i = BIT_INDEX[bit]
+    return i - i // 9 + 1
+
+def parse_turn(board, text):
+    """
+        Returns the single moves that make up the turn text on board,
+        written in PDN as squares joined by '-' for a move or 'x' for a
+        capture, e.g. "11-15" or "15x24x31". The squares a capture
+        passes through may be left out where only one sequence fits.
+    """
+    squares = [int(s) for s in re.split('[-x]', text)]
+    for move in board.get_moves(composite=True):
+        hops = board.hops(move)
+        piece = abs(hops[0]) & VALID_MOVE_BITS & board.pieces[board.active]
+        path = [square(piece)]
+        for hop in hops:
+            piece ^= abs(hop) & VALID_MOVE_BITS
+            path.append(square(piece))
+        if path[0] != squares[0] or path[-1] != squares[-1]:
+            continue
+        rest = iter(path[1:-1])
+        if all(s in rest for s in squares[1:-1]):
+            return hops
+    raise ValueError("Not a legal move: %r" % (text,))
+
+def tournament_games(path):
+    """
+        Yields (moves, winner) for every game in a tournament.py JSON
+        lines file.
+    """
+    winners = {'black': BLACK, 'white': WHITE, None: None}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield (record['moves'], winners[record['winner']])
+
+def pdn_games(path):
+    """
+        Yields (moves, winner) for every game in a PDN file that starts
+        from the usual position and has a result. Games set up from a
+        FEN tag, or with an illegal move, are skipped.
+    """
+    with open(path) as f:
+        text = f.read()
+    game = None
+    for match in _PDN_TOKEN.finditer(text):
+        (tag, value, token) = match.groups()
+        if tag is None and token is None:
+            # A comment or a variation
+            continue
+        # Tags after moves start the next game.
+        if game is None or (tag is not None and game['moves']):
+            if game is not None and not game['skip'] and game['result'] in RESULTS:
+                yield (game['moves'], RESULTS[game['result']])
+            game = {'board': CheckerBoard(), 'moves': [], 'result': None, 'skip': False}
+        if tag == 'Result':
+            game['result'] = value
+        elif tag == 'FEN':
+            game['skip'] = True
+        elif token in RESULTS or token == '*':
+            if not game['skip'] and token in RESULTS:
+                yield (game['moves'], RESULTS[token])
+            game = None
+        elif token is not None and not game['skip']:
+            turn = _PDN_MOVE.match(token)
+            if turn is None:
+                continue
+            try:
+                hops = parse_turn(game['board'], turn.group(1))
+            except ValueError:
+                game['skip'] = True
+                continue
+            for hop in hops:
+                game['board'].push(hop)
+            game['moves'].extend(hops)
+    if game is not None and not game['skip'] and game['result'] in RESULTS:
+        yield (game['moves'], RESULTS[game['result']])
+
+def build(games, plies=BOOK_PLIES):
+    """
+        Returns a dict mapping (hash, move) to [wins, draws, losses,
+        ply] for the first plies moves of each (moves, winner) in
+        games, played from the start.
+    """
+    entries = {}
+    for (moves, winner) in games:
+        B = CheckerBoard()
+        for (ply, move) in enumerate(moves[:plies]):
+            key = (B.hash, move)
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = [0, 0, 0, ply]
+            if winner is None:
+                entry[1] += 1
+            else:
+                entry[0 if winner == B.active else 2] += 1
+            entry[3] = min(entry[3], ply)
+            B.push(move)
+    return entries
+
+def write(entries, path=BOOK_FILE, plies=BOOK_PLIES):
+    """
+        Writes the entries built by build() to a book file at path.
+    """
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries), plies))
+        for ((h, move), (wins, draws, losses, ply)) in sorted(entries.items()):
+            f.write(ENTRY.pack(h, move, wins, draws, losses, ply))
+
+### CLASSES
+
+class Book:
+    def __init__(self, path=BOOK_FILE, plies=None, min_games=1):
+        """
+            Opens the book file at path through mmap. Book moves are
+            only played on boards fewer than plies plies into the game,
+            if given, counted by the board's undo stack when it is
+            probed, and only if played in at least min_games games.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.size, self.book_plies) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.data.close()
+            raise ValueError("Not a version %i opening book: %s" % (VERSION, path))
+        self.plies = plies
+        self.min_games = min_games
+        self.probes = 0
+        self.hits = 0
+
+    def entries(self, h):
+        """
+            Returns the (move, wins, draws, losses, ply) records of the
+            position with hash h.
+        """
+        (data, size, offset) = (self.data, ENTRY.size, HEADER.size)
+        (lo, hi) = (0, self.size)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(data, offset + mid * size)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        records = []
+        while lo < self.size:
+            record = ENTRY.unpack_from(data, offset + lo * size)
+            if record[0] != h:
+                break
+            records.append(record[1:])
+            lo += 1
+        return records
+
+    def moves(self, board):
+        """
+            Returns the (move, wins, draws, losses) of the usable book
+            moves of board.
+        """
+        if self.plies is not None and len(board.undo_stack) >= self.plies:
+            return []
+        return [(move, wins, draws, losses)
+                for (move, wins, draws, losses, _) in self.entries(board.hash)
+                if wins + draws + losses >= self.min_games]
+
+    def choose(self, board, rng=random):
+        """
+            Returns a book move of board chosen at random, each with
+            weight the points it scored (1 a win, 1/2 a draw), or None
+            if there is no book move that scored any.
+        """
+        self.probes += 1
+        moves = self.moves(board)
+        total = sum(wins + 0.5 * draws for (_, wins, draws, _) in moves)
+        if total == 0:
+            return None
+        self.hits += 1
+        r = rng.random() * total
+        for (move, wins, draws, _) in moves:
+            r -= wins + 0.5 * draws
+            if r < 0:
+                return move
+        return moves[-1][0]
+
+    def close(self):
+        self.data.close()
+
+### MAIN
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Opening books for arthur.")
+    commands = parser.add_subparsers()
+
+    make = commands.add_parser("build", help="build a book from played games")
+    make.add_argument("--tournament", nargs="*", default=[],
+                      help="tournament.py JSON lines files")
+    make.add_argument("--pdn", nargs="*", default=[], help="PDN files")
+    make.add_argument("--plies", type=int, default=BOOK_PLIES,
+                      help="plies of each game to put in the book")
+    make.add_argument("--output", default=BOOK_FILE)
+    make.set_defaults(run=run_build)
+
+    show = commands.add_parser("show", help="list the book moves of a position")
+    show.add_argument("--book", default=BOOK_FILE)
+    show.add_argument("--moves", nargs="*", default=[],
+                      help="PDN turns leading to the position, e.g. 11-15 23-19")
+    show.set_defaults(run=run_show)
+
+    info = commands.add_parser("info", help="count the book's positions and time probes")
+    info.add_argument("--book", default=BOOK_FILE)
+    info.set_defaults(run=run_info)
+
+    args = parser.parse_args(argv)
+    return args.run(args) or 0
+
+def run_build(args):
+    games = []
+    for path in args.tournament:
+        games.extend(tournament_games(path))
+    for path in args.pdn:
+        games.extend(pdn_games(path))
+    entries = build(games, args.plies)
+    write(entries, args.output, args.plies)
+    print("%i games, %i positions, %i moves written to %s"
+          % (len(games), len(set(h for (h, _) in entries)), len(entries), args.output))
+
+def run_show(args):
+    book = Book(args.book)
+    B = CheckerBoard()
+    for text in args.moves:
+        for hop in parse_turn(B, text):
+            B.push(hop)
+    print(B)
+    active = B.pieces[B.active]
+    for (move, wins, draws, losses) in sorted(book.moves(B), key=lambda m: -(m[1] + 0.5 * m[2])):
+        ends = abs(move) & VALID_MOVE_BITS
+        origin = ends & active
+        print("%2i%s%-2i %6i wins %6i draws %6i losses"
+              % (square(origin), 'x' if move < 0 else '-', square(ends ^ origin),
+                 wins, draws, losses))
+    book.close()
+
+def run_info(args):
+    book = Book(args.book)
+    hashes = sorted(set(KEY.unpack_from(book.data, HEADER.size + i * ENTRY.size)[0]
+                        for i in range(book.size)))
+    start = time.time()
+    for h in hashes:
+        book.entries(h)
+    elapsed = time.time() - start
+    print("%i moves in %i positions, %i plies per game"
+          % (book.size, len(hashes), book.book_plies))
+    print("%.2f us per probe" % (1e6 * elapsed / max(len(hashes), 1)))
+    book.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
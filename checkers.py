@@ -7,6 +7,15 @@
 #
 # Created July 29, 2014
 
+import random
+import re
+import struct
+
+from bitboard import CAPTURED, bits, compress, expand, flip, popcount
+from bitboard import RIGHT_FORWARD, LEFT_FORWARD, RIGHT_BACKWARD, LEFT_BACKWARD
+from bitboard import RIGHT_FORWARD_JUMP, LEFT_FORWARD_JUMP
+from bitboard import RIGHT_BACKWARD_JUMP, LEFT_BACKWARD_JUMP
+
 ### CONSTANTS
 
 # Black moves "forward", white moves "backward"
@@ -19,13 +28,202 @@ BLACK, WHITE = 0, 1
 
 UNUSED_BITS = 0b100000000100000000100000000100000000
 
+# The bits of a move that hold its origin and destination. A composite
+# move also has the squares it captures in the bits above these.
+VALID_MOVE_BITS = 2**36 - 1
+
+# Zobrist keys. Every bitboard square gets one random 64-bit key per
+# (bitboard, colour) pair, plus keys for the side to move and for the
+# square of a piece that is in the middle of a jump sequence. The hash
+# of a position is the XOR of the keys of everything that is on it.
+_zobrist_rng = random.Random(0x5A1E)
+_SQUARES = [1 << i for i in range(36) if not (UNUSED_BITS >> i) & 1]
+
+ZOBRIST_FORWARD = [dict((sq, _zobrist_rng.getrandbits(64)) for sq in _SQUARES)
+                   for _ in (BLACK, WHITE)]
+ZOBRIST_BACKWARD = [dict((sq, _zobrist_rng.getrandbits(64)) for sq in _SQUARES)
+                    for _ in (BLACK, WHITE)]
+ZOBRIST_JUMP = dict((sq, _zobrist_rng.getrandbits(64)) for sq in _SQUARES)
+ZOBRIST_WHITE_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+# Draw rules. A position that has occurred REPETITIONS times, with the
+# same side to move, is a draw, and so is a game that goes DRAW_PLIES
+# plies (40 moves each) without a capture or a man moving.
+REPETITIONS = 3
+DRAW_PLIES = 80
+
+# Reasons a game ends, as given by CheckerBoard.outcome()
+NO_MOVES = 'no moves'
+REPETITION = 'repetition'
+MOVE_COUNT = 'move count'
+ADJUDICATION = 'adjudication'
+
+# The packed form of a position (see CheckerBoard.pack): the squares
+# of the black pieces, the white pieces and the kings as 32-bit sets,
+# the side to move, the square of a piece in the middle of a jump (or
+# 0) and the plies since the last capture or man move. As an integer
+# the fields take bits 0, 32, 64, 96, 97 and 103 on, 119 bits in all.
+PACKED = struct.Struct('<IIIBBH')
+
+# The FEN-style form of a position, such as "B:W21,22,K30:B1,2"; see
+# CheckerBoard.fen()
+_FEN = re.compile(r'^([BW]):([BW])([^:]*):([BW])([^:]*)(?::J(\d+))?$')
+
+# The (step, jump) tables a piece can capture along, in the order
+# jumps_from() tries them
+_FORWARD_JUMPS = ((RIGHT_FORWARD, RIGHT_FORWARD_JUMP), (LEFT_FORWARD, LEFT_FORWARD_JUMP))
+_BACKWARD_JUMPS = ((RIGHT_BACKWARD, RIGHT_BACKWARD_JUMP), (LEFT_BACKWARD, LEFT_BACKWARD_JUMP))
+_KING_JUMPS = _FORWARD_JUMPS + _BACKWARD_JUMPS
+
+### FUNCTIONS
+
+def zobrist_hash(forward, backward, active, jumping=0):
+    """
+        Returns the Zobrist hash of the position given by the forward
+        and backward bitboards of both colours, the side to move and
+        the square of a piece in the middle of a jump, if any.
+    """
+    h = 0
+    for color in (BLACK, WHITE):
+        for (board_bits, keys) in ((forward[color], ZOBRIST_FORWARD[color]),
+                                   (backward[color], ZOBRIST_BACKWARD[color])):
+            while board_bits:
+                sq = board_bits & -board_bits
+                h ^= keys[sq]
+                board_bits ^= sq
+    if jumping:
+        h ^= ZOBRIST_JUMP[jumping]
+    if active == WHITE:
+        h ^= ZOBRIST_WHITE_TO_MOVE
+    return h
+
+NEW_GAME_HASH = zobrist_hash([0x1eff, 0], [0, 0x7fbc00000], BLACK)
+
+def square_bit(square):
+    """
+        Returns the bitboard bit of square, numbered 1 to 32 from black's
+        side as in get_move_strings().
+    """
+    return 1 << ((square - 1) + (square - 1) // 8)
+
+def board_from_squares(black_men=(), black_kings=(), white_men=(), white_kings=(),
+                       active=BLACK):
+    """
+        Returns a board with pieces on the given squares, numbered 1 to
+        32, and active to move.
+    """
+    B = CheckerBoard()
+    B.set_position(sum(square_bit(s) for s in black_men),
+                   sum(square_bit(s) for s in black_kings),
+                   sum(square_bit(s) for s in white_men),
+                   sum(square_bit(s) for s in white_kings),
+                   active)
+    return B
+
+def flip_move(move):
+    """
+        Returns move as it is made on a board turned through 180
+        degrees with the colours swapped (see CheckerBoard.flipped).
+        Flipping a move twice gives it back.
+    """
+    sign = -1 if move < 0 else 1
+    move *= sign
+    return sign * (flip(move & VALID_MOVE_BITS) | flip(move >> 36) << 36)
+
+def _board_from_fields(black, white, kings, active, jump_square, quiet_plies):
+    """
+        Returns a board for the fields of a packed position.
+    """
+    (black, white, kings) = (expand(black), expand(white), expand(kings))
+    B = CheckerBoard.__new__(CheckerBoard)
+    B.draw_plies = DRAW_PLIES
+    B.adjudication = None
+    B.forward = [0, 0]
+    B.backward = [0, 0]
+    B.pieces = [0, 0]
+    B.set_position(black & ~kings, black & kings, white & ~kings, white & kings, active)
+    B.quiet_plies = quiet_plies
+    if jump_square:
+        piece = square_bit(jump_square)
+        B.jump = 1
+        B.mandatory_jumps = B.jumps_from(piece)
+        B.hash ^= ZOBRIST_JUMP[piece]
+    return B
+
+def unpack(code):
+    """
+        Returns a new board for the integer code from
+        CheckerBoard.pack(). It has no move history.
+    """
+    return _board_from_fields(code & 0xffffffff, code >> 32 & 0xffffffff,
+                              code >> 64 & 0xffffffff, code >> 96 & 1,
+                              code >> 97 & 0x3f, code >> 103 & 0xffff)
+
+def from_bytes(buffer, offset=0):
+    """
+        Returns a new board for the 16 bytes from CheckerBoard.to_bytes()
+        at offset in buffer, which may be any object supporting the
+        buffer protocol (bytes, bytearray, mmap, ...); nothing is copied
+        out of it first.
+    """
+    return _board_from_fields(*PACKED.unpack_from(buffer, offset))
+
+def board_from_fen(text):
+    """
+        Returns a new board for a position in the form given by
+        CheckerBoard.fen(). Squares may also be given as ranges, as in
+        "B:W21-32:B1-12". Raises ValueError if text is not such a
+        position.
+    """
+    match = _FEN.match(re.sub(r'\s+', '', text).upper())
+    if match is None or match.group(2) == match.group(4):
+        raise ValueError("Not a position: %r" % (text,))
+    (side, first, first_squares, second, second_squares, jump) = match.groups()
+    sets = {}
+    for (color, squares) in ((first, first_squares), (second, second_squares)):
+        men = kings = 0
+        for item in filter(None, squares.split(',')):
+            king = item.startswith('K')
+            (low, _, high) = item.lstrip('K').partition('-')
+            try:
+                numbers = range(int(low), int(high or low) + 1)
+            except ValueError:
+                raise ValueError("Not a square in %r: %r" % (text, item))
+            for number in numbers:
+                if not 1 <= number <= 32:
+                    raise ValueError("Not a square in %r: %r" % (text, item))
+                if king:
+                    kings |= 1 << (number - 1)
+                else:
+                    men |= 1 << (number - 1)
+        sets[color] = (men, kings)
+    ((black_men, black_kings), (white_men, white_kings)) = (sets['B'], sets['W'])
+    occupied = [black_men, black_kings, white_men, white_kings]
+    if sum(popcount(x) for x in occupied) != popcount(black_men | black_kings
+                                                      | white_men | white_kings):
+        raise ValueError("Two pieces on one square in %r" % (text,))
+    jump_square = int(jump) if jump else 0
+    if jump_square and not (1 <= jump_square <= 32):
+        raise ValueError("Not a square in %r: %r" % (text, jump))
+    return _board_from_fields(black_men | black_kings, white_men | white_kings,
+                              black_kings | white_kings, BLACK if side == 'B' else WHITE,
+                              jump_square, 0)
+
 ### CLASSES
 
-class CheckerBoard:
-    def __init__(self):
+class CheckerBoard(object):
+    def __init__(self, draw_plies=DRAW_PLIES, adjudication=None):
         """
             Initiates board via new_game().
+
+            draw_plies is the number of plies without a capture or a
+            man moving after which the game is drawn, or None for no
+            limit. If adjudication is a number, a game reaching that
+            limit is instead won by a side whose material (2 for each
+            man and 3 for each king) leads by adjudication or more.
         """
+        self.draw_plies = draw_plies
+        self.adjudication = adjudication
         self.forward = [None, None]
         self.backward = [None, None]
         self.pieces = [None, None]
@@ -51,6 +249,42 @@ class CheckerBoard:
         self.jump = 0
         self.mandatory_jumps = []
 
+        self.hash = NEW_GAME_HASH
+
+        # Plies since the last capture or man move
+        self.quiet_plies = 0
+
+        # One entry per push(), holding what pop() needs to restore.
+        # The hashes in it are the history of the game.
+        self.undo_stack = []
+
+        # Legal moves and whether there are any, worked out on demand
+        # and forgotten whenever the board changes.
+        self._moves = None
+        self._has_moves = None
+
+    def set_position(self, black_men, black_kings, white_men, white_kings, active=BLACK):
+        """
+            Resets current state to the position with pieces on the
+            squares set in the given bitboards and active to move.
+        """
+        self.forward[BLACK] = black_men | black_kings
+        self.backward[BLACK] = black_kings
+        self.forward[WHITE] = white_kings
+        self.backward[WHITE] = white_men | white_kings
+        self.pieces[BLACK] = black_men | black_kings
+        self.pieces[WHITE] = white_men | white_kings
+        self.empty = UNUSED_BITS ^ (2**36 - 1) ^ (self.pieces[BLACK] | self.pieces[WHITE])
+        self.active = active
+        self.passive = 1 - active
+        self.jump = 0
+        self.mandatory_jumps = []
+        self.hash = zobrist_hash(self.forward, self.backward, active)
+        self.quiet_plies = 0
+        self.undo_stack = []
+        self._moves = None
+        self._has_moves = None
+
     def make_move(self, move):
         """
             Updates the game state to reflect the effects of the input
@@ -58,85 +292,140 @@ class CheckerBoard:
 
             A legal move is represented by an integer with exactly two
             bits turned on: the old position and the new position.
+            A composite move (see composite_jumps) makes a whole jump
+            sequence at once.
         """
+        self._moves = None
+        self._has_moves = None
         active = self.active
         passive = self.passive
-        if move < 0:
+        h = self.hash
+        capture = move < 0
+        if move < 0 and -move > VALID_MOVE_BITS:
             move *= -1
-            taken_piece = int(1 << sum(i for (i, b) in enumerate(bin(move)[::-1]) if b == '1')/2)
-            self.pieces[passive] ^= taken_piece
-            if self.forward[passive] & taken_piece:
-                self.forward[passive] ^= taken_piece
-            if self.backward[passive] & taken_piece:
-                self.backward[passive] ^= taken_piece
-            self.jump = 1
+            ends = move & VALID_MOVE_BITS
+            origin = ends & self.pieces[active]
+            # A king can jump in a circle back to where it started.
+            destination = (ends ^ origin) or origin
+            for taken_piece in bits(move >> 36):
+                h = self._remove(passive, taken_piece, h)
+            if self.jump:
+                h ^= ZOBRIST_JUMP[origin]
+                self.jump = 0
+                self.mandatory_jumps = []
+            move = origin ^ destination
+        else:
+            if move < 0:
+                move *= -1
+                h = self._remove(passive, CAPTURED[move], h)
+                if self.jump:
+                    # The piece continuing the sequence is no longer pending.
+                    h ^= ZOBRIST_JUMP[move & self.pieces[active]]
+                self.jump = 1
+            origin = move & self.pieces[active]
+            destination = move ^ origin
+
+        kings = self.backward[BLACK] if active == BLACK else self.forward[WHITE]
+        if capture or not origin & kings:
+            self.quiet_plies = 0
+        else:
+            self.quiet_plies += 1
 
         self.pieces[active] ^= move
         if self.forward[active] & move:
             self.forward[active] ^= move
+            h ^= ZOBRIST_FORWARD[active][origin] ^ ZOBRIST_FORWARD[active][destination]
         if self.backward[active] & move:
             self.backward[active] ^= move
+            h ^= ZOBRIST_BACKWARD[active][origin] ^ ZOBRIST_BACKWARD[active][destination]
 
-        destination = move & self.pieces[active]
         self.empty = UNUSED_BITS ^ (2**36 - 1) ^ (self.pieces[BLACK] | self.pieces[WHITE])
 
         if self.jump:
             self.mandatory_jumps = self.jumps_from(destination)
             if self.mandatory_jumps:
+                self.hash = h ^ ZOBRIST_JUMP[destination]
                 return
 
-        if active == BLACK and (destination & 0x780000000) != 0:
+        if active == BLACK and (destination & 0x780000000 & ~self.backward[BLACK]) != 0:
             self.backward[BLACK] |= destination
-        elif active == WHITE and (destination & 0xf) != 0:
+            h ^= ZOBRIST_BACKWARD[BLACK][destination]
+        elif active == WHITE and (destination & 0xf & ~self.forward[WHITE]) != 0:
             self.forward[WHITE] |= destination
+            h ^= ZOBRIST_FORWARD[WHITE][destination]
 
         self.jump = 0
         self.active, self.passive = self.passive, self.active
+        self.hash = h ^ ZOBRIST_WHITE_TO_MOVE
+
+    def _remove(self, color, piece, h):
+        """
+            Takes piece of color off the board and returns the hash h
+            updated to match.
+        """
+        self.pieces[color] ^= piece
+        if self.forward[color] & piece:
+            self.forward[color] ^= piece
+            h ^= ZOBRIST_FORWARD[color][piece]
+        if self.backward[color] & piece:
+            self.backward[color] ^= piece
+            h ^= ZOBRIST_BACKWARD[color][piece]
+        return h
+
+    def push(self, move):
+        """
+            Makes the input move in place, like make_move, and records
+            enough of the previous state for pop() to take it back.
+        """
+        self.undo_stack.append((self.forward[BLACK], self.forward[WHITE],
+                                self.backward[BLACK], self.backward[WHITE],
+                                self.active, self.jump, self.mandatory_jumps,
+                                self.hash, self._moves, self._has_moves,
+                                self.quiet_plies))
+        self.make_move(move)
+
+    def pop(self):
+        """
+            Takes back the last move made with push().
+        """
+        (fb, fw, bb, bw, active, self.jump, self.mandatory_jumps,
+         self.hash, self._moves, self._has_moves,
+         self.quiet_plies) = self.undo_stack.pop()
+        self.forward[BLACK] = fb
+        self.forward[WHITE] = fw
+        self.backward[BLACK] = bb
+        self.backward[WHITE] = bw
+        self.pieces[BLACK] = fb | bb
+        self.pieces[WHITE] = fw | bw
+        self.empty = UNUSED_BITS ^ (2**36 - 1) ^ (fb | bb | fw | bw)
+        self.active = active
+        self.passive = active ^ 1
 
     def peek_move(self, move):
         """
-            Updates the game state to reflect the effects of the input
-            move.
+            Returns a new board with the effects of the input move
+            applied, leaving the calling object untouched.
 
             A legal move is represented by an integer with exactly two
             bits turned on: the old position and the new position.
         """
         B = self.copy()
-        active = B.active
-        passive = B.passive
-        if move < 0:
-            move *= -1
-            taken_piece = int(1 << sum(i for (i, b) in enumerate(bin(move)[::-1]) if b == '1')/2)
-            B.pieces[passive] ^= taken_piece
-            if B.forward[passive] & taken_piece:
-                B.forward[passive] ^= taken_piece
-            if B.backward[passive] & taken_piece:
-                B.backward[passive] ^= taken_piece
-            B.jump = 1
-
-        B.pieces[active] ^= move
-        if B.forward[active] & move:
-            B.forward[active] ^= move
-        if B.backward[active] & move:
-            B.backward[active] ^= move
-
-        destination = move & B.pieces[active]
-        B.empty = UNUSED_BITS ^ (2**36 - 1) ^ (B.pieces[BLACK] | B.pieces[WHITE])
-
-        if B.jump:
-            B.mandatory_jumps = B.jumps_from(destination)
-            if B.mandatory_jumps:
-                return B
-
-        if active == BLACK and (destination & 0x780000000) != 0:
-            B.backward[BLACK] |= destination
-        elif active == WHITE and (destination & 0xf) != 0:
-            B.forward[WHITE] |= destination
+        B.make_move(move)
+        return B
 
-        B.jump = 0
-        B.active, B.passive = B.passive, B.active
+    def zobrist_hash(self):
+        """
+            Computes the Zobrist hash of the current state from scratch.
 
-        return B
+            make_move keeps self.hash up to date incrementally; this is
+            used to check it.
+        """
+        if self.jump:
+            # Every pending jump starts from the same square.
+            jumping = -self.mandatory_jumps[0] & self.pieces[self.active]
+        else:
+            jumping = 0
+        return zobrist_hash(self.forward, self.backward, self.active, jumping)
 
     # These methods return an integer whose active bits are those squares
     # that can make the move indicated by the method name.
@@ -157,14 +446,184 @@ class CheckerBoard:
     def left_backward_jumps(self):
         return (self.empty << 10) & (self.pieces[self.passive] << 5) & self.backward[self.active]
 
-    def get_moves(self):
+    def get_moves(self, composite=False):
         """
             Returns a list of all possible moves.
 
             A legal move is represented by an integer with exactly two
             bits turned on: the old position and the new position.
 
-            Jumps are indicated with a negative sign.
+            Jumps are indicated with a negative sign. With composite,
+            they are whole jump sequences as from composite_jumps().
+
+            The list is kept until the board next changes, so asking
+            again is free. Callers must not modify it.
+        """
+        if self._moves is None:
+            self._moves = self._generate_moves()
+        if composite and self._moves and self._moves[0] < 0:
+            return self.composite_jumps()
+        return self._moves
+
+    def composite_jumps(self):
+        """
+            Returns every legal jump sequence as one composite move, or
+            an empty list if there is nothing to capture.
+
+            A composite move is the negative of an integer holding the
+            origin and final square of the jumping piece in its low 36
+            bits and every square it captures in the 36 above them. A
+            piece that returns to where it started has only that bit
+            set in the low 36. make_move() applies a composite move in
+            a single update, and hops() turns it back into the single
+            jumps that get_moves() lists.
+
+            Sequences are listed by their first jump, in get_moves()
+            order, then by the order jumps_from() gives.
+        """
+        active = self.active
+        pieces = self.pieces[active]
+        paths = []
+
+        def extend(origin, steps, square, passive, empty, captured):
+            more = False
+            for (step, jump) in steps:
+                target = jump[square]
+                if target & empty:
+                    taken = step[square]
+                    if taken & passive:
+                        more = True
+                        extend(origin, steps, target, passive ^ taken,
+                               (empty | square | taken) ^ target, captured | taken)
+            if not more:
+                paths.append(-(captured << 36 | origin | square))
+
+        for hop in self.mandatory_jumps if self.jump else self.get_jumps():
+            ends = -hop
+            origin = ends & pieces
+            if origin & self.forward[active] & self.backward[active]:
+                steps = _KING_JUMPS
+            elif active == BLACK:
+                steps = _FORWARD_JUMPS
+            else:
+                steps = _BACKWARD_JUMPS
+            taken = CAPTURED[ends]
+            landing = ends ^ origin
+            extend(origin, steps, landing, self.pieces[self.passive] ^ taken,
+                   (self.empty | origin | taken) ^ landing, taken)
+        return paths
+
+    def hops(self, move):
+        """
+            Returns the list of single moves, as listed by get_moves(),
+            that make up move on this board. That is [move] unless move
+            is composite.
+        """
+        if move >= 0 or -move <= VALID_MOVE_BITS:
+            return [move]
+        origin = -move & VALID_MOVE_BITS & self.pieces[self.active]
+        path = []
+
+        def walk(captured):
+            for hop in self.get_moves():
+                ends = -hop
+                if not path and not ends & origin:
+                    continue
+                destination = ends & ~self.pieces[self.active]
+                taken = captured | CAPTURED[ends]
+                path.append(hop)
+                self.push(hop)
+                if self.jump:
+                    found = walk(taken)
+                else:
+                    found = -(taken << 36 | origin | destination) == move
+                self.pop()
+                if found:
+                    return True
+                path.pop()
+            return False
+
+        if not walk(0):
+            raise ValueError("Not a legal move: %r" % (move,))
+        return path
+
+    def has_moves(self):
+        """
+            Returns True if the side to move has a legal move, without
+            building the move list if it can help it.
+        """
+        if self._has_moves is None:
+            if self._moves is not None:
+                self._has_moves = len(self._moves) > 0
+            elif self.jump:
+                self._has_moves = len(self.mandatory_jumps) > 0
+            else:
+                self._has_moves = (self.right_forward() | self.left_forward()
+                                   | self.right_backward() | self.left_backward()
+                                   | self.right_forward_jumps() | self.left_forward_jumps()
+                                   | self.right_backward_jumps() | self.left_backward_jumps()) != 0
+        return self._has_moves
+
+    def move_stages(self, composite=False):
+        """
+            Yields the legal moves in batches, building each batch only
+            when it is asked for: the pending jumps of a multi-jump, or
+            else every capture, or else the normal moves one direction
+            at a time (right forward, left forward, right backward, left
+            backward). Joined together the batches are get_moves().
+
+            With composite, captures come as composite moves.
+
+            The board must be in the same state whenever the next batch
+            is asked for.
+        """
+        if self._moves is not None:
+            yield self.get_moves(composite)
+            return
+        if self.jump:
+            yield self.composite_jumps() if composite else self.mandatory_jumps
+            return
+        jumps = self.get_jumps()
+        if jumps:
+            self._moves = jumps
+            yield self.composite_jumps() if composite else jumps
+            return
+        yield [0x11 * b for b in bits(self.right_forward())]
+        yield [0x21 * b for b in bits(self.left_forward())]
+        yield [0x11 * b for b in bits(self.right_backward() >> 4)]
+        yield [0x21 * b for b in bits(self.left_backward() >> 5)]
+
+    def is_legal(self, move):
+        """
+            Returns True if move is one of get_moves(), or of
+            get_moves(composite=True), generating as little as possible
+            to find out.
+        """
+        if move < -VALID_MOVE_BITS:
+            return move in self.composite_jumps()
+        if self._moves is not None:
+            return move in self._moves
+        if self.jump:
+            return move in self.mandatory_jumps
+        if move < 0:
+            return move in self.get_jumps()
+        origin = move & self.pieces[self.active]
+        destination = move ^ origin
+        if not destination & self.empty or destination & (destination - 1):
+            return False
+        if destination == RIGHT_FORWARD.get(origin) or destination == LEFT_FORWARD.get(origin):
+            legal = origin & self.forward[self.active]
+        elif destination == RIGHT_BACKWARD.get(origin) or destination == LEFT_BACKWARD.get(origin):
+            legal = origin & self.backward[self.active]
+        else:
+            return False
+        # A normal move is only legal when there is nothing to capture.
+        return legal != 0 and (self.right_forward_jumps() | self.left_forward_jumps()
+                               | self.right_backward_jumps() | self.left_backward_jumps()) == 0
+
+    def _generate_moves(self):
+        """
+            Builds the list returned by get_moves().
         """
         # First check if we are in a jump sequence
         if self.jump:
@@ -182,10 +641,12 @@ class CheckerBoard:
             rb = self.right_backward()
             lb = self.left_backward()
 
-            moves =  [0x11 << i for (i, bit) in enumerate(bin(rf)[::-1]) if bit == '1']
-            moves += [0x21 << i for (i, bit) in enumerate(bin(lf)[::-1]) if bit == '1']
-            moves += [0x11 << i - 4 for (i, bit) in enumerate(bin(rb)[::-1]) if bit == '1']
-            moves += [0x21 << i - 5 for (i, bit) in enumerate(bin(lb)[::-1]) if bit == '1']
+            # A move is its origin bit times 0x11 or 0x21 shifted to
+            # the lower of its two squares.
+            moves =  [0x11 * b for b in bits(rf)]
+            moves += [0x21 * b for b in bits(lf)]
+            moves += [0x11 * b for b in bits(rb >> 4)]
+            moves += [0x21 * b for b in bits(lb >> 5)]
             return moves
 
 
@@ -206,10 +667,10 @@ class CheckerBoard:
         moves = []
 
         if (rfj | lfj | rbj | lbj) != 0:
-            moves += [-0x101 << i for (i, bit) in enumerate(bin(rfj)[::-1]) if bit == '1']
-            moves += [-0x401 << i for (i, bit) in enumerate(bin(lfj)[::-1]) if bit == '1']
-            moves += [-0x101 << i - 8 for (i, bit) in enumerate(bin(rbj)[::-1]) if bit == '1']
-            moves += [-0x401 << i - 10 for (i, bit) in enumerate(bin(lbj)[::-1]) if bit == '1']
+            moves += [-0x101 * b for b in bits(rfj)]
+            moves += [-0x401 * b for b in bits(lfj)]
+            moves += [-0x101 * b for b in bits(rbj >> 8)]
+            moves += [-0x401 * b for b in bits(lbj >> 10)]
 
         return moves
 
@@ -221,32 +682,24 @@ class CheckerBoard:
             the square of the piece in question (using the internal numeric
             representaiton of the board).
         """
-        if self.active == BLACK:
-            rfj = (self.empty >> 8) & (self.pieces[self.passive] >> 4) & piece
-            lfj = (self.empty >> 10) & (self.pieces[self.passive] >> 5) & piece
-            if piece & self.backward[self.active]: # piece at square is a king
-                rbj = (self.empty << 8) & (self.pieces[self.passive] << 4) & piece
-                lbj = (self.empty << 10) & (self.pieces[self.passive] << 5) & piece
-            else:
-                rbj = 0
-                lbj = 0
-        else:
-            rbj = (self.empty << 8) & (self.pieces[self.passive] << 4) & piece
-            lbj = (self.empty << 10) & (self.pieces[self.passive] << 5) & piece
-            if piece & self.forward[self.active]: # piece at square is a king
-                rfj = (self.empty >> 8) & (self.pieces[self.passive] >> 4) & piece
-                lfj = (self.empty >> 10) & (self.pieces[self.passive] >> 5) & piece
-            else:
-                rfj = 0
-                lfj = 0
-
+        passive = self.pieces[self.passive]
+        empty = self.empty
         moves = []
-        if (rfj | lfj | rbj | lbj) != 0:
-            moves += [-0x101 << i for (i, bit) in enumerate(bin(rfj)[::-1]) if bit == '1']
-            moves += [-0x401 << i for (i, bit) in enumerate(bin(lfj)[::-1]) if bit == '1']
-            moves += [-0x101 << i - 8 for (i, bit) in enumerate(bin(rbj)[::-1]) if bit == '1']
-            moves += [-0x401 << i - 10 for (i, bit) in enumerate(bin(lbj)[::-1]) if bit == '1']
-
+        # Men only jump in the direction their colour moves, kings in both.
+        if piece & self.forward[self.active]:
+            target = RIGHT_FORWARD_JUMP[piece]
+            if target & empty and RIGHT_FORWARD[piece] & passive:
+                moves.append(-(piece | target))
+            target = LEFT_FORWARD_JUMP[piece]
+            if target & empty and LEFT_FORWARD[piece] & passive:
+                moves.append(-(piece | target))
+        if piece & self.backward[self.active]:
+            target = RIGHT_BACKWARD_JUMP[piece]
+            if target & empty and RIGHT_BACKWARD[piece] & passive:
+                moves.append(-(piece | target))
+            target = LEFT_BACKWARD_JUMP[piece]
+            if target & empty and LEFT_BACKWARD[piece] & passive:
+                moves.append(-(piece | target))
         return moves
 
     def takeable(self, piece):
@@ -264,22 +717,195 @@ class CheckerBoard:
             return True
         return False
 
+    def repetitions(self):
+        """
+            Returns how many times the current position has occurred in
+            the game so far, this time included. Only positions since
+            the last capture or man move can be the same as it.
+        """
+        h = self.hash
+        stack = self.undo_stack
+        count = 1
+        for plies in range(2, min(self.quiet_plies, len(stack)) + 1, 2):
+            if stack[-plies][7] == h:
+                count += 1
+        return count
+
+    def material(self, color):
+        """
+            Returns the material of color: 2 for each man and 3 for
+            each king.
+        """
+        kings = self.forward[color] & self.backward[color]
+        return 2 * popcount(self.pieces[color]) + popcount(kings)
+
+    def outcome(self):
+        """
+            Returns None while the game goes on, and otherwise a pair
+            (winner, reason): winner is BLACK, WHITE or None for a draw,
+            and reason one of NO_MOVES, REPETITION, MOVE_COUNT and
+            ADJUDICATION.
+        """
+        if not self.has_moves():
+            return (self.passive, NO_MOVES)
+        if self.jump:
+            return None
+        if self.quiet_plies >= 4 and self.repetitions() >= REPETITIONS:
+            return (None, REPETITION)
+        if self.draw_plies is not None and self.quiet_plies >= self.draw_plies:
+            winner = self.adjudicate()
+            if winner is not None:
+                return (winner, ADJUDICATION)
+            return (None, MOVE_COUNT)
+        return None
+
+    def adjudicate(self):
+        """
+            Returns the side whose material leads by adjudication or
+            more, or None if neither does or adjudication is off.
+        """
+        if self.adjudication is None:
+            return None
+        lead = self.material(BLACK) - self.material(WHITE)
+        if lead >= self.adjudication:
+            return BLACK
+        if -lead >= self.adjudication:
+            return WHITE
+        return None
+
     def is_over(self):
-        return len(self.get_moves()) == 0
+        """
+            Returns True if the game has ended, won or drawn; see
+            outcome() for the result.
+        """
+        return self.outcome() is not None
+
+    def flipped(self):
+        """
+            Returns a new board with this position turned through 180
+            degrees and the colours swapped. Black's men then move the
+            way white's did, so the position is the same game with the
+            sides renamed, and flip_move() maps moves between the two.
+            The new board has no move history.
+        """
+        B = CheckerBoard.__new__(CheckerBoard)
+        B.forward = [flip(self.backward[WHITE]), flip(self.backward[BLACK])]
+        B.backward = [flip(self.forward[WHITE]), flip(self.forward[BLACK])]
+        B.pieces = [B.forward[BLACK] | B.backward[BLACK], B.forward[WHITE] | B.backward[WHITE]]
+        B.empty = UNUSED_BITS ^ (2**36 - 1) ^ (B.pieces[BLACK] | B.pieces[WHITE])
+        B.active = self.passive
+        B.passive = self.active
+        B.jump = self.jump
+        B.mandatory_jumps = [flip_move(m) for m in self.mandatory_jumps]
+        B.hash = B.zobrist_hash()
+        B.quiet_plies = self.quiet_plies
+        B.draw_plies = self.draw_plies
+        B.adjudication = self.adjudication
+        B.undo_stack = []
+        B._moves = None
+        B._has_moves = self._has_moves
+        return B
+
+    def canonical(self):
+        """
+            Returns (board, flipped): the position with black to move,
+            and whether it had to be flipped() to get it. With black
+            already to move, board is this board itself.
+        """
+        if self.active == BLACK:
+            return (self, False)
+        return (self.flipped(), True)
+
+    def canonical_hash(self):
+        """
+            Returns the Zobrist hash of canonical()'s board, without
+            making it. A position and its flipped() twin share it.
+        """
+        if self.active == BLACK:
+            return self.hash
+        if self.jump:
+            jumping = flip(-self.mandatory_jumps[0] & self.pieces[self.active])
+        else:
+            jumping = 0
+        return zobrist_hash([flip(self.backward[WHITE]), flip(self.backward[BLACK])],
+                            [flip(self.forward[WHITE]), flip(self.forward[BLACK])],
+                            BLACK, jumping)
+
+    def _packed_fields(self):
+        """
+            Returns the fields of the packed form of the position.
+        """
+        if self.jump:
+            piece = -self.mandatory_jumps[0] & self.pieces[self.active]
+            jump_square = compress(piece).bit_length()
+        else:
+            jump_square = 0
+        return (compress(self.pieces[BLACK]), compress(self.pieces[WHITE]),
+                compress(self.forward[BLACK] & self.backward[BLACK]
+                         | self.forward[WHITE] & self.backward[WHITE]),
+                self.active, jump_square, min(self.quiet_plies, 0xffff))
+
+    def pack(self):
+        """
+            Returns the position as one integer of at most 119 bits,
+            laid out as described at PACKED. unpack() turns it back
+            into a board, without the move history.
+        """
+        (black, white, kings, active, jump_square, quiet_plies) = self._packed_fields()
+        return (black | white << 32 | kings << 64 | active << 96 | jump_square << 97
+                | quiet_plies << 103)
+
+    def to_bytes(self):
+        """
+            Returns the position packed into the 16-byte struct PACKED,
+            which from_bytes() reads back.
+        """
+        return PACKED.pack(*self._packed_fields())
+
+    def fen(self):
+        """
+            Returns the position as a FEN string in the usual draughts
+            form: the side to move, then the white and the black
+            pieces by square number, kings marked with K, as in
+            "B:W21,22,K30:B1,2". A piece in the middle of a jump
+            sequence is given after them, as in ":J14". The plies since
+            the last capture or man move are left out.
+        """
+        def squares(pieces, kings):
+            return ','.join(('K%i' if bit & kings else '%i') % (i + 1)
+                            for (i, bit) in enumerate(1 << j for j in range(32))
+                            if bit & pieces)
+        (black, white, kings, active, jump_square, _) = self._packed_fields()
+        text = "%s:W%s:B%s" % ('B' if active == BLACK else 'W',
+                               squares(white, kings), squares(black, kings))
+        if jump_square:
+            text += ":J%i" % jump_square
+        return text
 
     def copy(self):
         """
-            Returns a new board with the exact same state as the calling object.
+            Returns a new board with the exact same state as the calling
+            object. Of the undo stack it keeps only the moves since the
+            last capture or man move, the ones repetitions() looks back
+            over, so copying costs no more late in a game than early on;
+            the copy cannot be popped back past them.
         """
-        B = CheckerBoard()
+        B = CheckerBoard.__new__(CheckerBoard)
         B.active = self.active
         B.backward = [x for x in self.backward]
         B.empty = self.empty
         B.forward = [x for x in self.forward]
+        B.hash = self.hash
         B.jump = self.jump
         B.mandatory_jumps = [x for x in self.mandatory_jumps]
         B.passive = self.passive
         B.pieces = [x for x in self.pieces]
+        B.quiet_plies = self.quiet_plies
+        B.draw_plies = self.draw_plies
+        B.adjudication = self.adjudication
+        B.undo_stack = self.undo_stack[-self.quiet_plies:] if self.quiet_plies else []
+        B._moves = self._moves
+        B._has_moves = self._has_moves
         return B
 
     def __str__(self):
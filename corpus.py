@@ -0,0 +1,63 @@
+"""
+    This module generates corpora of positions from self-play.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Reproducible sets of game positions for validating and benchmarking
+# the engine. Games mix shallow arthur moves with random ones, so the
+# positions look like play without all being the same game.
+#
+# Created October 18, 2026
+
+import os
+import pickle
+import random
+
+import arthur
+import checkers
+from transposition import TranspositionTable
+
+def positions(count, seed=0, depth=1, randomness=0.3, max_plies=200):
+    """
+        Returns a list of count boards met in self-play games, always
+        the same for the same arguments.
+
+        Each move is random with probability randomness and otherwise
+        chosen by arthur searching to depth. Every position is
+        included, so some are in the middle of a jump sequence.
+    """
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        B = checkers.CheckerBoard()
+        plies = 0
+        while not B.is_over() and plies < max_plies and len(boards) < count:
+            boards.append(B.copy())
+            if rng.random() < randomness:
+                move = rng.choice(B.get_moves())
+            else:
+                move = arthur.move_function(B, depth, table=TranspositionTable(1024))
+            B.push(move)
+            plies += 1
+    for B in boards:
+        B.undo_stack = []
+    return boards
+
+def cached_positions(path, count, seed=0):
+    """
+        Returns positions(count, seed), read from the pickle file at
+        path if it holds them and otherwise generated and saved there,
+        so that repeated benchmarks do not replay the games. The boards
+        are saved packed, 16 bytes each (see CheckerBoard.to_bytes).
+    """
+    size = checkers.PACKED.size
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            (saved_count, saved_seed, packed) = pickle.load(f)
+        if (saved_count, saved_seed) == (count, seed):
+            return [checkers.from_bytes(packed, i) for i in range(0, len(packed), size)]
+    boards = positions(count, seed)
+    with open(path, 'wb') as f:
+        pickle.dump((count, seed, b''.join(B.to_bytes() for B in boards)), f,
+                    pickle.HIGHEST_PROTOCOL)
+    return boards
@@ -0,0 +1,82 @@
+"""
+    This module defines the EvalCache class.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# A bounded cache of per-position evaluation results keyed by Zobrist
+# hash, with clock (second chance) eviction.
+#
+# Created October 18, 2026
+
+### CLASSES
+
+class EvalCache:
+    def __init__(self, size=2**16):
+        """
+            Creates an empty cache with room for size entries.
+        """
+        self.size = size
+        self.clear()
+
+    def clear(self):
+        """
+            Removes every entry and resets the hit and miss counters.
+        """
+        self.index = {}
+        self.keys = [None] * self.size
+        self.values = [None] * self.size
+        self.referenced = [False] * self.size
+        self.hand = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+            Returns the value stored for key, or None.
+        """
+        i = self.index.get(key)
+        if i is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.referenced[i] = True
+        return self.values[i]
+
+    def peek(self, key):
+        """
+            Returns the value stored for key, or None, without counting
+            a hit or miss or saving the entry from eviction.
+        """
+        i = self.index.get(key)
+        if i is None:
+            return None
+        return self.values[i]
+
+    def put(self, key, value):
+        """
+            Stores value for key. When the cache is full, the clock hand
+            sweeps the slots, giving every entry used since the hand last
+            passed a second chance, and evicts the first one that was not.
+        """
+        i = self.index.get(key)
+        if i is not None:
+            self.values[i] = value
+            return
+        referenced = self.referenced
+        hand = self.hand
+        while referenced[hand]:
+            referenced[hand] = False
+            hand = (hand + 1) % self.size
+        old = self.keys[hand]
+        if old is not None:
+            del self.index[old]
+        self.keys[hand] = key
+        self.values[hand] = value
+        self.index[key] = hand
+        self.hand = (hand + 1) % self.size
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
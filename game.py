@@ -65,7 +65,7 @@ def main():
                     print "Please input a valid move number."
                     continue
 
-            B.make_move(legal_moves[move_idx])
+            B.push(legal_moves[move_idx])
 
             # If jumps remain, then the board will not update current player
             if B.active == current_player:
@@ -76,10 +76,7 @@ def main():
                 turn += 1
 
         print B
-        if B.active == WHITE:
-            print "Congrats Black, you win!"
-        else:
-            print "Congrats White, you win!"
+        announce(B)
 
         return 0
 
@@ -125,7 +122,7 @@ def main():
                     else:
                         print "Please input a valid move number."
                         continue
-                B.make_move(legal_moves[move_idx])
+                B.push(legal_moves[move_idx])
                 # If jumps remain, then the board will not update current player
                 if B.active == current_player:
                     print "Jumps must be taken."
@@ -134,7 +131,7 @@ def main():
                     current_player = B.active
                     turn += 1
             else:
-                B.make_move(cpu.make_move(B))
+                B.push(cpu.make_move(B))
                 if B.active == current_player:
                     print "Jumps must be taken."
                     continue
@@ -142,10 +139,7 @@ def main():
                     current_player = B.active
                     turn += 1
         print B
-        if B.active == WHITE:
-            print "Congrats Black, you win!"
-        else:
-            print "Congrats White, you win!"
+        announce(B)
         return 0
     else:
         agent_module = raw_input("Enter name of first agent module: ");
@@ -165,23 +159,32 @@ def main():
             return 0
         else:
             while not B.is_over():
-                B.make_move(cpu_1.make_move(B))
+                B.push(cpu_1.make_move(B))
                 if B.active == current_player:
                     continue
                 current_player = B.active
                 while B.active == current_player and not B.is_over():
-                    B.make_move(cpu_2.make_move(B))
+                    B.push(cpu_2.make_move(B))
                 current_player = B.active
-            if B.active == WHITE:
-                print "Congrats Black, you win!"
-            else:
-                print "Congrats White, you win!"
+            announce(B)
             return 0
 
 
 
 def game_over(board):
-    return len(board.get_moves()) == 0
+    return board.is_over()
+
+def announce(board):
+    """
+        Prints the result of the finished game on board.
+    """
+    (winner, reason) = board.outcome()
+    if winner is None:
+        print "Draw by %s." % reason
+    elif winner == BLACK:
+        print "Congrats Black, you win!"
+    else:
+        print "Congrats White, you win!"
 
 def get_move_strings(board):
     rfj = board.right_forward_jumps()
@@ -0,0 +1,115 @@
+"""
+    This module defines the MoveOrderer class.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Move ordering for alpha-beta search. The sooner the move that
+# refutes a position is searched, the sooner the rest are cut off.
+#
+# Created October 18, 2026
+
+### CLASSES
+
+class MoveOrderer:
+    def __init__(self, killers_per_ply=2):
+        """
+            Creates an orderer with no killer moves or history yet.
+        """
+        self.killers_per_ply = killers_per_ply
+        # killers[ply] holds the quiet moves that most recently caused
+        # a cutoff at that ply, newest first.
+        self.killers = []
+        # history[move] grows by depth**2 every time move causes a
+        # cutoff anywhere in the tree.
+        self.history = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def order(self, moves, ply, hash_move=None):
+        """
+            Returns moves sorted so that the hash (or principal
+            variation) move comes first, then captures, then the killer
+            moves of this ply, then everything else by history score.
+            Moves that tie keep their relative order.
+
+            In checkers a capture is compulsory, so a list of moves is
+            either all captures or has none.
+        """
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+        else:
+            killers = ()
+        history = self.history
+
+        def key(move):
+            if move == hash_move:
+                return (-3, 0)
+            if move < 0:
+                return (-2, -history.get(move, 0))
+            if move in killers:
+                return (-1, killers.index(move))
+            return (0, -history.get(move, 0))
+
+        return sorted(moves, key=key)
+
+    def staged(self, board, ply, hash_move=None, composite=False):
+        """
+            Yields the moves of board in nearly the order order() would
+            give them, but generated lazily through board.move_stages(),
+            so a search that cuts off early never generates the rest.
+
+            Captures are all generated at once and ordered as a whole.
+            Otherwise the hash move and killer moves are tried as soon
+            as they are known to be legal, and then each direction's
+            normal moves are ordered by history within their batch.
+
+            With composite, captures are whole jump sequences.
+        """
+        history = self.history
+        tried = []
+        for batch in board.move_stages(composite):
+            if batch and batch[0] < 0:
+                for move in self.order(batch, ply, hash_move):
+                    yield move
+                return
+            if not tried:
+                if ply < len(self.killers):
+                    candidates = [hash_move] + self.killers[ply]
+                else:
+                    candidates = [hash_move]
+                for move in candidates:
+                    if move is not None and move not in tried and board.is_legal(move):
+                        tried.append(move)
+                        yield move
+                tried.append(None)
+            for move in sorted(batch, key=lambda m: -history.get(m, 0)):
+                if move not in tried:
+                    yield move
+
+    def record_cutoff(self, move, ply, depth, index):
+        """
+            Records that move, the index-th searched at this ply, caused
+            a beta cutoff in a search to the given depth.
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        self.history[move] = self.history.get(move, 0) + depth * depth
+        if move < 0:
+            return
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move in killers:
+            killers.remove(move)
+        killers.insert(0, move)
+        del killers[self.killers_per_ply:]
+
+    def first_move_cutoff_rate(self):
+        """
+            Returns the fraction of cutoffs caused by the first move
+            searched, or None if there were none.
+        """
+        if not self.cutoffs:
+            return None
+        return float(self.first_move_cutoffs) / self.cutoffs
@@ -0,0 +1,140 @@
+"""
+    This module implements a parallel version of arthur's search.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Lazy SMP: the main process runs arthur's usual iterative deepening
+# search while helper processes search the same position, each with
+# its root moves in a different order. They share nothing but a
+# lockless transposition table in shared memory, so the helpers help
+# only by filling it with results the main search can cut off on.
+#
+# The table is an anonymous mapping, which only forked processes
+# inherit, so helpers are always forked, whatever multiprocessing's
+# default start method. Parallel search is not available where fork
+# is not.
+#
+#     parallel.move_function(board, time_limit=5, workers=8)
+#
+# Created October 18, 2026
+
+import multiprocessing
+import random
+import time
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+import arthur
+from transposition import SharedTranspositionTable
+
+### CONSTANTS
+
+# The table shared by every call in this process, created on first use
+# so that importing the module does not map memory.
+_table = None
+
+### FUNCTIONS
+
+def shared_table():
+    """
+        Returns the shared transposition table used by move_function.
+    """
+    global _table
+    if _table is None:
+        _table = SharedTranspositionTable()
+    return _table
+
+def _fork_context():
+    """
+        Returns the multiprocessing context that forks its processes.
+    """
+    if not hasattr(multiprocessing, 'get_context'):
+        # Python 2 always forks on POSIX.
+        return multiprocessing
+    return multiprocessing.get_context('fork')
+
+def _helper(board, depth, time_limit, table, seed, results):
+    """
+        The body of a helper process: searches board with its root
+        moves shuffled by seed, and reports its result on results as
+        (depth reached, score, move, nodes).
+    """
+    info = {}
+    move = arthur.move_function(board, depth, time_limit, table, info, random.Random(seed))
+    results.put((info['depth'], info['score'], move, info['nodes']))
+
+def move_function(board, depth=7, time_limit=None, workers=None, table=None, info=None):
+    """
+        Returns the best move for the side to move in board, searching
+        with workers processes in all. workers defaults to the number
+        of CPUs, and with workers=1 this is arthur.move_function on a
+        shared table.
+
+        With a time_limit every process deepens until the deadline.
+        Without one, every helper searches to depth as the main
+        process does, and helpers still searching when the main search
+        ends are stopped, as they could not return a deeper result.
+        Either way the move from the deepest search that finished is
+        returned, the main process's winning ties.
+
+        info is filled in as by arthur.move_function, with the number
+        of workers and the nodes searched by all processes together.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if table is None:
+        table = shared_table()
+    if info is None:
+        info = {}
+    if len(board.get_moves()) == 1:
+        move = arthur.move_function(board, depth, time_limit, table, info)
+        info['workers'] = workers
+        info['total_nodes'] = info['nodes']
+        return move
+
+    # Every process calls table.new_search() as it starts, so they all
+    # move on to the same generation.
+    context = _fork_context()
+    results = context.Queue()
+    helpers = []
+    for i in range(1, workers):
+        helper = context.Process(target=_helper,
+                                 args=(board.copy(), depth, time_limit, table, i, results))
+        helper.daemon = True
+        helper.start()
+        helpers.append(helper)
+
+    best_move = arthur.move_function(board, depth, time_limit, table, info)
+    best = (-1 if info['depth'] is None else info['depth'], 1)
+    nodes = info['nodes']
+
+    finished = 0
+    if time_limit is not None:
+        # The helpers stop at the same deadline; allow them a moment
+        # to report.
+        deadline = time.time() + 0.1 * time_limit + 0.05
+    else:
+        deadline = time.time()
+    while finished < len(helpers):
+        try:
+            (reached, score, move, helper_nodes) = results.get(timeout=max(0, deadline - time.time()))
+        except Empty:
+            break
+        finished += 1
+        nodes += helper_nodes
+        if reached is not None and (reached, 0) > best:
+            best = (reached, 0)
+            best_move = move
+            info['depth'] = reached
+            info['score'] = score
+            info['pv'] = arthur.principal_variation(board, move, table, reached + 2)
+    for helper in helpers:
+        if helper.is_alive():
+            helper.terminate()
+        helper.join()
+
+    info['workers'] = workers
+    info['total_nodes'] = nodes
+    return best_move
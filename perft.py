@@ -0,0 +1,173 @@
+"""
+    This module implements perft, the move generation test.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Counts the positions reached after every sequence of legal turns up
+# to some depth, from the start and from positions that exercise the
+# tricky rules. Wrong counts mean move generation is broken; the time
+# taken measures how fast get_moves and push/pop are, e.g.
+#
+#     python perft.py check
+#     python perft.py run --position start --depth 7
+#     python perft.py divide --position king-backward --depth 3
+#
+# A turn is one whole move, so every hop of a multi-jump is made
+# before the depth goes down by one. With --composite each jump
+# sequence is made as one composite move, which must give the same
+# counts.
+#
+# Created October 18, 2026
+
+import argparse
+import sys
+import time
+
+import checkers
+from checkers import BLACK, WHITE
+
+### CONSTANTS
+
+# Test positions, as squares 1 to 32 for (black men, black kings,
+# white men, white kings) and the side to move.
+POSITIONS = {
+    'start': None,
+    # Black's man on 1 can take three men in a row or branch off
+    # after the first.
+    'multi-jump': (([1, 3, 4], [], [6, 14, 15, 24, 29, 31], [], BLACK)),
+    # Black's man on 21 is crowned jumping to 30, which ends its move
+    # even though it could jump on as a king.
+    'promotion-jump': (([9, 21], [], [11, 25, 26, 32], [], BLACK)),
+    # Black's king on 28 jumps backward and then has a choice of two
+    # more backward jumps.
+    'king-backward': (([2], [28], [15, 16, 24, 30], [], BLACK)),
+    # White to move, with a king that can jump forward and back.
+    'white-king': (([5, 6, 14, 22, 23], [], [27, 31], [18], WHITE)),
+}
+
+# Leaf counts for depths 0, 1, 2, ... The start position's are the
+# published values for English draughts; the others come from the
+# original move generator, before the engine was optimised.
+REFERENCE = {
+    'start': [1, 7, 49, 302, 1469, 7361, 36768, 179740, 845931],
+    'multi-jump': [1, 2, 12, 55, 302, 1057, 4849, 16959],
+    'promotion-jump': [1, 1, 6, 12, 61, 221, 959, 3755],
+    'king-backward': [1, 2, 8, 40, 138, 530, 1669, 7447],
+    'white-king': [1, 2, 2, 10, 48, 178, 874, 3131],
+}
+
+### FUNCTIONS
+
+def position(name):
+    """
+        Returns a new board set up as the named test position.
+    """
+    if POSITIONS[name] is None:
+        return checkers.CheckerBoard()
+    return checkers.board_from_squares(*POSITIONS[name])
+
+def perft(board, depth, composite=False):
+    """
+        Returns the number of move sequences of depth turns from board.
+    """
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in board.get_moves(composite):
+        board.push(move)
+        if board.jump:
+            nodes += perft(board, depth, composite)
+        else:
+            nodes += perft(board, depth - 1, composite)
+        board.pop()
+    return nodes
+
+def divide(board, depth, composite=False):
+    """
+        Returns a list of (move, count) pairs, the perft count below
+        each legal first move. Without composite the hops of a
+        multi-jump are listed as one move each, under the first hop.
+    """
+    counts = []
+    for move in board.get_moves(composite):
+        board.push(move)
+        counts.append((move, perft(board, depth if board.jump else depth - 1, composite)))
+        board.pop()
+    return counts
+
+def move_string(board, move):
+    """
+        Returns move on board as "origin to destination" in square
+        numbers.
+    """
+    move = abs(move) & checkers.VALID_MOVE_BITS
+    origin = move & board.pieces[board.active]
+    square = lambda bit: [i - i // 9 + 1 for i in range(36) if bit >> i & 1][0]
+    return "%i to %i" % (square(origin), square((move ^ origin) or origin))
+
+### COMMANDS
+
+def run_perft(args):
+    B = position(args.position)
+    for depth in range(1, args.depth + 1):
+        start = time.time()
+        nodes = perft(B, depth, args.composite)
+        elapsed = time.time() - start
+        print("depth %2i %10i nodes %8.3fs %10.0f nodes/sec"
+              % (depth, nodes, elapsed, nodes / max(elapsed, 1e-9)))
+    return 0
+
+def run_divide(args):
+    B = position(args.position)
+    total = 0
+    for (move, count) in divide(B, args.depth, args.composite):
+        print("%-10s %i" % (move_string(B, move), count))
+        total += count
+    print("total %i" % total)
+    return 0
+
+def run_check(args):
+    failures = 0
+    for name in sorted(POSITIONS):
+        B = position(name)
+        for (depth, expected) in enumerate(REFERENCE[name][:args.depth + 1]):
+            start = time.time()
+            nodes = perft(B, depth, args.composite)
+            elapsed = time.time() - start
+            status = "ok" if nodes == expected else "FAIL (expected %i)" % expected
+            failures += nodes != expected
+            print("%-15s depth %2i %10i nodes %8.3fs %s" % (name, depth, nodes, elapsed, status))
+    print("%i failures" % failures)
+    return 1 if failures else 0
+
+### MAIN
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move generation counts for CheckerBoard.")
+    commands = parser.add_subparsers()
+
+    run = commands.add_parser("run", help="count leaves to each depth and time it")
+    run.add_argument("--position", choices=sorted(POSITIONS), default="start")
+    run.add_argument("--depth", type=int, default=6)
+    run.add_argument("--composite", action="store_true",
+                     help="make jump sequences as composite moves")
+    run.set_defaults(run=run_perft)
+
+    div = commands.add_parser("divide", help="count leaves below each root move")
+    div.add_argument("--position", choices=sorted(POSITIONS), default="start")
+    div.add_argument("--depth", type=int, default=4)
+    div.add_argument("--composite", action="store_true",
+                     help="make jump sequences as composite moves")
+    div.set_defaults(run=run_divide)
+
+    check = commands.add_parser("check", help="compare counts with the reference values")
+    check.add_argument("--depth", type=int, default=6)
+    check.add_argument("--composite", action="store_true",
+                       help="make jump sequences as composite moves")
+    check.set_defaults(run=run_check)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
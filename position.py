@@ -0,0 +1,342 @@
+"""
+    This module defines the Position and PositionLine classes.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# An immutable, hashable checkers position: a tuple of the bitboards
+# and scalars a CheckerBoard keeps, with the same move generation and
+# direction mask methods. Making a move returns a new Position and
+# leaves the old one as it was, so positions can be shared, kept as
+# dict keys and sent between processes freely, e.g.
+#
+#     P = Position.start()
+#     for move in P.get_moves():
+#         child = P.make_move(move)
+#
+# arthur.move_function accepts a Position. It searches it through a
+# PositionLine, a CheckerBoard whose push() steps to the next Position
+# and whose pop() steps back to the last.
+#
+# Created October 18, 2026
+
+from operator import itemgetter
+
+import checkers
+from bitboard import CAPTURED, VALID_SQUARES, bits
+from bitboard import RIGHT_FORWARD, LEFT_FORWARD, RIGHT_BACKWARD, LEFT_BACKWARD
+from bitboard import RIGHT_FORWARD_JUMP, LEFT_FORWARD_JUMP
+from bitboard import RIGHT_BACKWARD_JUMP, LEFT_BACKWARD_JUMP
+from checkers import BLACK, WHITE, CheckerBoard, DRAW_PLIES, VALID_MOVE_BITS
+from checkers import ZOBRIST_FORWARD, ZOBRIST_BACKWARD, ZOBRIST_JUMP, ZOBRIST_WHITE_TO_MOVE
+
+### CONSTANTS
+
+# CheckerBoard's methods, shared by Position wherever they only read
+# the board
+_BOARD = CheckerBoard.__dict__
+
+### FUNCTIONS
+
+def _jumps_from(piece, forward, backward, passive, empty):
+    """
+        Returns the jumps the piece can make, as CheckerBoard.jumps_from
+        does, given the forward and backward bitboards of its side, the
+        pieces of the other side and the empty squares.
+    """
+    moves = []
+    if piece & forward:
+        target = RIGHT_FORWARD_JUMP[piece]
+        if target & empty and RIGHT_FORWARD[piece] & passive:
+            moves.append(-(piece | target))
+        target = LEFT_FORWARD_JUMP[piece]
+        if target & empty and LEFT_FORWARD[piece] & passive:
+            moves.append(-(piece | target))
+    if piece & backward:
+        target = RIGHT_BACKWARD_JUMP[piece]
+        if target & empty and RIGHT_BACKWARD[piece] & passive:
+            moves.append(-(piece | target))
+        target = LEFT_BACKWARD_JUMP[piece]
+        if target & empty and LEFT_BACKWARD[piece] & passive:
+            moves.append(-(piece | target))
+    return moves
+
+### CLASSES
+
+class Position(tuple):
+    """
+        A position as the tuple (forward, backward, pieces, empty,
+        active, jump, mandatory_jumps, hash, quiet_plies), each field
+        meaning what the CheckerBoard attribute of the same name does.
+        forward, backward and pieces are (black, white) pairs, and
+        mandatory_jumps is a tuple.
+    """
+    __slots__ = ()
+
+    forward = property(itemgetter(0))
+    backward = property(itemgetter(1))
+    pieces = property(itemgetter(2))
+    empty = property(itemgetter(3))
+    active = property(itemgetter(4))
+    jump = property(itemgetter(5))
+    mandatory_jumps = property(itemgetter(6))
+    hash = property(itemgetter(7))
+    quiet_plies = property(itemgetter(8))
+
+    # Positions never hold a move list; the CheckerBoard methods below
+    # see it as not worked out yet.
+    _moves = None
+
+    @property
+    def passive(self):
+        return self[4] ^ 1
+
+    def __hash__(self):
+        return self[7]
+
+    def __reduce__(self):
+        return (Position, (tuple(self),))
+
+    @classmethod
+    def from_board(cls, board):
+        """
+            Returns the position on board, a CheckerBoard.
+        """
+        return cls((tuple(board.forward), tuple(board.backward), tuple(board.pieces),
+                    board.empty, board.active, board.jump, tuple(board.mandatory_jumps),
+                    board.hash, board.quiet_plies))
+
+    @classmethod
+    def start(cls):
+        """
+            Returns the position at the start of a game.
+        """
+        return cls.from_board(CheckerBoard())
+
+    def to_board(self):
+        """
+            Returns a new CheckerBoard set up as this position.
+        """
+        return checkers.unpack(self.pack())
+
+    def make_move(self, move):
+        """
+            Returns the position after move, which may be any move
+            CheckerBoard.make_move takes.
+        """
+        (forward, backward, pieces, empty, active, jump, _, h, quiet_plies) = self
+        passive = active ^ 1
+        (active_forward, active_backward) = (forward[active], backward[active])
+        (passive_forward, passive_backward) = (forward[passive], backward[passive])
+        capture = move < 0
+        composite = capture and -move > VALID_MOVE_BITS
+        if capture:
+            move *= -1
+            if composite:
+                ends = move & VALID_MOVE_BITS
+                origin = ends & pieces[active]
+                destination = (ends ^ origin) or origin
+                taken = bits(move >> 36)
+                move = origin ^ destination
+            else:
+                origin = move & pieces[active]
+                destination = move ^ origin
+                taken = [CAPTURED[move]]
+            for piece in taken:
+                if passive_forward & piece:
+                    passive_forward ^= piece
+                    h ^= ZOBRIST_FORWARD[passive][piece]
+                if passive_backward & piece:
+                    passive_backward ^= piece
+                    h ^= ZOBRIST_BACKWARD[passive][piece]
+            if jump:
+                h ^= ZOBRIST_JUMP[origin]
+        else:
+            origin = move & pieces[active]
+            destination = move ^ origin
+
+        if capture or not origin & active_forward & active_backward:
+            quiet_plies = 0
+        else:
+            quiet_plies += 1
+
+        if active_forward & move:
+            active_forward ^= move
+            h ^= ZOBRIST_FORWARD[active][origin] ^ ZOBRIST_FORWARD[active][destination]
+        if active_backward & move:
+            active_backward ^= move
+            h ^= ZOBRIST_BACKWARD[active][origin] ^ ZOBRIST_BACKWARD[active][destination]
+        passive_pieces = passive_forward | passive_backward
+        empty = VALID_SQUARES ^ (active_forward | active_backward | passive_pieces)
+
+        # As on a CheckerBoard, any move but a composite one made in the
+        # middle of a jump sequence may go on with it.
+        if not composite and (capture or jump):
+            jumps = _jumps_from(destination, active_forward, active_backward,
+                                passive_pieces, empty)
+            if jumps:
+                h ^= ZOBRIST_JUMP[destination]
+                return Position._make(active_forward, active_backward, passive_forward,
+                                      passive_backward, empty, active, 1, tuple(jumps), h,
+                                      quiet_plies)
+
+        if active == BLACK and destination & 0x780000000 & ~active_backward:
+            active_backward |= destination
+            h ^= ZOBRIST_BACKWARD[BLACK][destination]
+        elif active == WHITE and destination & 0xf & ~active_forward:
+            active_forward |= destination
+            h ^= ZOBRIST_FORWARD[WHITE][destination]
+        return Position._make(active_forward, active_backward, passive_forward,
+                              passive_backward, empty, passive, 0, (), h ^ ZOBRIST_WHITE_TO_MOVE,
+                              quiet_plies)
+
+    @staticmethod
+    def _make(active_forward, active_backward, passive_forward, passive_backward, empty,
+              to_move, jump, mandatory_jumps, h, quiet_plies):
+        # Returns a Position given the bitboards of the side that just
+        # moved (or is still jumping) and of the other side.
+        if (to_move == BLACK) == (jump == 0):
+            forward = (passive_forward, active_forward)
+            backward = (passive_backward, active_backward)
+        else:
+            forward = (active_forward, passive_forward)
+            backward = (active_backward, passive_backward)
+        return Position((forward, backward,
+                         (forward[BLACK] | backward[BLACK], forward[WHITE] | backward[WHITE]),
+                         empty, to_move, jump, mandatory_jumps, h, quiet_plies))
+
+    def get_moves(self, composite=False):
+        """
+            Returns a list of all possible moves, as
+            CheckerBoard.get_moves does. It is worked out afresh on every
+            call.
+        """
+        if self[5]:
+            moves = list(self[6])
+        else:
+            moves = self._generate_moves()
+        if composite and moves and moves[0] < 0:
+            return self.composite_jumps()
+        return moves
+
+    def has_moves(self):
+        """
+            Returns True if the side to move has a legal move.
+        """
+        if self[5]:
+            return len(self[6]) > 0
+        return (self.right_forward() | self.left_forward()
+                | self.right_backward() | self.left_backward()
+                | self.right_forward_jumps() | self.left_forward_jumps()
+                | self.right_backward_jumps() | self.left_backward_jumps()) != 0
+
+    def is_over(self):
+        """
+            Returns True if the side to move has no moves, or if the
+            position has gone DRAW_PLIES plies without a capture or a
+            man moving. A Position has no history, so repetitions are
+            left to PositionLine.
+        """
+        return not self.has_moves() or (not self[5] and self[8] >= DRAW_PLIES)
+
+    def move_stages(self, composite=False):
+        """
+            Yields the legal moves in batches, as
+            CheckerBoard.move_stages does.
+        """
+        if self[5]:
+            yield self.composite_jumps() if composite else list(self[6])
+            return
+        jumps = self.get_jumps()
+        if jumps:
+            yield self.composite_jumps() if composite else jumps
+            return
+        yield [0x11 * b for b in bits(self.right_forward())]
+        yield [0x21 * b for b in bits(self.left_forward())]
+        yield [0x11 * b for b in bits(self.right_backward() >> 4)]
+        yield [0x21 * b for b in bits(self.left_backward() >> 5)]
+
+    right_forward = _BOARD['right_forward']
+    left_forward = _BOARD['left_forward']
+    right_backward = _BOARD['right_backward']
+    left_backward = _BOARD['left_backward']
+    right_forward_jumps = _BOARD['right_forward_jumps']
+    left_forward_jumps = _BOARD['left_forward_jumps']
+    right_backward_jumps = _BOARD['right_backward_jumps']
+    left_backward_jumps = _BOARD['left_backward_jumps']
+    get_jumps = _BOARD['get_jumps']
+    jumps_from = _BOARD['jumps_from']
+    composite_jumps = _BOARD['composite_jumps']
+    is_legal = _BOARD['is_legal']
+    takeable = _BOARD['takeable']
+    material = _BOARD['material']
+    zobrist_hash = _BOARD['zobrist_hash']
+    _generate_moves = _BOARD['_generate_moves']
+    _packed_fields = _BOARD['_packed_fields']
+    pack = _BOARD['pack']
+    to_bytes = _BOARD['to_bytes']
+    fen = _BOARD['fen']
+    __str__ = _BOARD['__str__']
+
+class PositionLine(CheckerBoard):
+    def __init__(self, position, draw_plies=DRAW_PLIES, adjudication=None):
+        """
+            Creates a board set up as position. Its state is always a
+            Position: push() replaces it with the next one and keeps the
+            old one on undo_stack, with the moves worked out for it so
+            far, and pop() takes it back off. The undo stack is the line
+            of positions played.
+        """
+        self.draw_plies = draw_plies
+        self.adjudication = adjudication
+        self.undo_stack = []
+        self._load(position)
+
+    def _load(self, position, moves=None, has_moves=None):
+        self.position = position
+        (self.forward, self.backward, self.pieces, self.empty, self.active, self.jump,
+         self.mandatory_jumps, self.hash, self.quiet_plies) = position
+        self.passive = position[4] ^ 1
+        self.mandatory_jumps = list(position[6])
+        self._moves = moves
+        self._has_moves = has_moves
+
+    def new_game(self):
+        self.undo_stack = []
+        self._load(Position.start())
+
+    def set_position(self, black_men, black_kings, white_men, white_kings, active=BLACK):
+        B = CheckerBoard()
+        B.set_position(black_men, black_kings, white_men, white_kings, active)
+        self.undo_stack = []
+        self._load(Position.from_board(B))
+
+    def make_move(self, move):
+        self._load(self.position.make_move(move))
+
+    def push(self, move):
+        self.undo_stack.append((self.position, self._moves, self._has_moves))
+        self._load(self.position.make_move(move))
+
+    def pop(self):
+        self._load(*self.undo_stack.pop())
+
+    def repetitions(self):
+        h = self.hash
+        stack = self.undo_stack
+        count = 1
+        for plies in range(2, min(self.quiet_plies, len(stack)) + 1, 2):
+            if stack[-plies][0][7] == h:
+                count += 1
+        return count
+
+    def copy(self):
+        """
+            Returns a new line at the same position, with the history
+            since the last capture or man move, as CheckerBoard.copy()
+            keeps.
+        """
+        B = PositionLine(self.position, self.draw_plies, self.adjudication)
+        B.undo_stack = self.undo_stack[-self.quiet_plies:] if self.quiet_plies else []
+        B._moves = self._moves
+        B._has_moves = self._has_moves
+        return B
@@ -0,0 +1,206 @@
+"""
+    This module implements matches stopped early by a sequential
+    probability ratio test.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Plays two agents against each other, as tournament.py does, until
+# the SPRT can tell whether the first is elo1 or more stronger than
+# the second (H1) or no more than elo0 (H0), e.g.
+#
+#     python sprt.py arthur:depth=5 arthur:depth=4 --elo0 0 --elo1 20
+#
+# The running state is checkpointed to a JSON file after every game,
+# and a match started again with the same checkpoint carries on from
+# where it stopped.
+#
+# Created October 18, 2026
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import tournament
+
+### CONSTANTS
+
+H0, H1 = 'H0', 'H1'
+
+# Arguments that must match for a checkpoint to be resumed.
+MATCH_SETTINGS = ['first', 'second', 'elo0', 'elo1', 'alpha', 'beta', 'seed',
+                  'alternate', 'opening_plies', 'max_plies', 'draw_plies', 'adjudication']
+
+### FUNCTIONS
+
+def expected_score(elo):
+    """
+        Returns the expected score of a player elo points stronger.
+    """
+    return 1 / (1 + 10 ** (-elo / 400.0))
+
+def outcome_probabilities(wins, draws, losses, mean):
+    """
+        Returns the probabilities (win, draw, loss) of greatest
+        likelihood for a wins/draws/losses record, among those whose
+        expected score per game is mean. All three counts must be
+        nonzero.
+
+        They are the record's frequencies f scaled as f / (1 + l*(a -
+        mean)) for the score a of each result, with l found by
+        bisection.
+    """
+    n = float(wins + draws + losses)
+    outcomes = [(wins / n, 1.0 - mean), (draws / n, 0.5 - mean), (losses / n, -mean)]
+    # The mean of the scaled probabilities is mean where this, which
+    # falls as l rises, is 0, for l between the bounds that keep every
+    # probability positive.
+    def excess(l):
+        return sum(f * d / (1 + l * d) for (f, d) in outcomes)
+    (lo, hi) = (-1 / (1 - mean), 1 / mean)
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        if excess(mid) > 0:
+            lo = mid
+        else:
+            hi = mid
+    l = (lo + hi) / 2
+    return [f / (1 + l * d) for (f, d) in outcomes]
+
+def llr(wins, draws, losses, elo0, elo1):
+    """
+        Returns the log-likelihood ratio of H1 (the Elo difference is
+        elo1) against H0 (it is elo0) for a wins/draws/losses record,
+        under the trinomial model of a game's result: each hypothesis
+        takes the result probabilities of greatest likelihood that
+        give its expected score.
+
+        The model needs a win, a draw and a loss to estimate from, so
+        until the record has all three the ratio is 0 and the test
+        cannot stop; a streak of one result decides nothing.
+    """
+    if not (wins and draws and losses):
+        return 0.0
+    p0 = outcome_probabilities(wins, draws, losses, expected_score(elo0))
+    p1 = outcome_probabilities(wins, draws, losses, expected_score(elo1))
+    return sum(k * math.log(b / a) for (k, a, b) in zip((wins, draws, losses), p0, p1))
+
+def bounds(alpha, beta):
+    """
+        Returns the LLR bounds (lower, upper) below which the test
+        accepts H0 and above which it accepts H1, for false positive
+        rate alpha and false negative rate beta.
+    """
+    return (math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha))
+
+def decision(state):
+    """
+        Returns H0 or H1 if the test has accepted one, else None.
+    """
+    value = llr(state['wins'], state['draws'], state['losses'], state['elo0'], state['elo1'])
+    (lower, upper) = bounds(state['alpha'], state['beta'])
+    if value <= lower:
+        return H0
+    if value >= upper:
+        return H1
+    return None
+
+def load_checkpoint(path, settings):
+    """
+        Returns the state saved at path, or a fresh state for settings
+        if there is none. Raises ValueError if the saved match was
+        played with other settings.
+    """
+    if path and os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        for key in MATCH_SETTINGS:
+            if state.get(key) != settings[key]:
+                raise ValueError("Checkpoint %s was made with %s=%r, not %r"
+                                 % (path, key, state.get(key), settings[key]))
+        return state
+    state = dict((key, settings[key]) for key in MATCH_SETTINGS)
+    state.update({'wins': 0, 'draws': 0, 'losses': 0, 'finished': [], 'seconds': 0.0})
+    return state
+
+def save_checkpoint(path, state):
+    """
+        Writes state to path, replacing the old file only once the new
+        one is complete.
+    """
+    if not path:
+        return
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, sort_keys=True)
+    os.rename(tmp, path)
+
+### MAIN
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plays a match until an SPRT decides it.")
+    parser.add_argument("first", help="agent spec, e.g. arthur:depth=5")
+    parser.add_argument("second", help="agent spec, e.g. arthur:depth=4")
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=20.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--max-games", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-alternate", dest="alternate", action="store_false",
+                        help="first always plays black")
+    parser.add_argument("--opening-plies", type=int, default=8,
+                        help="random moves at the start of every game")
+    parser.add_argument("--max-plies", type=int, default=400,
+                        help="plies after which a game is a draw")
+    tournament.add_draw_arguments(parser)
+    parser.add_argument("--checkpoint", default="sprt.json")
+    parser.add_argument("--output", default="sprt.jsonl")
+    args = parser.parse_args(argv)
+
+    state = load_checkpoint(args.checkpoint, vars(args))
+    (lower, upper) = bounds(args.alpha, args.beta)
+    finished = set(state['finished'])
+    games = [game for game in tournament.schedule(args.first, args.second, args.max_games,
+                                                  args.seed, args.alternate,
+                                                  args.opening_plies, args.max_plies,
+                                                  args.draw_plies, args.adjudication)
+             if game['game'] not in finished]
+    result = decision(state)
+    start = time.time() - state['seconds']
+    if result is None and games:
+        with open(args.output, 'a') as f:
+            for game in tournament.play(games, args.processes):
+                f.write(json.dumps(game, sort_keys=True) + "\n")
+                f.flush()
+                score = tournament.first_agent_score(game, args.first)
+                state[{1: 'wins', 0.5: 'draws', 0: 'losses'}[score]] += 1
+                state['finished'].append(game['game'])
+                state['seconds'] = time.time() - start
+                save_checkpoint(args.checkpoint, state)
+                value = llr(state['wins'], state['draws'], state['losses'],
+                            args.elo0, args.elo1)
+                print("game %i: W/D/L %i/%i/%i, LLR %.2f (%.2f, %.2f)"
+                      % (game['game'], state['wins'], state['draws'], state['losses'],
+                         value, lower, upper))
+                result = decision(state)
+                if result is not None:
+                    break
+
+    for line in tournament.summary(args.first, args.second, state['wins'], state['draws'],
+                                   state['losses'], state['seconds']):
+        print(line)
+    if result == H1:
+        print("%s accepted: %s is at least %g Elo stronger" % (H1, args.first, args.elo1))
+    elif result == H0:
+        print("%s accepted: %s is no more than %g Elo stronger" % (H0, args.first, args.elo0))
+    else:
+        print("No decision after %i games" % len(state['finished']))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+    This module defines the SearchStats and JsonlRecorder classes.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Instrumentation for arthur's search. Pass a SearchStats as the stats
+# argument of arthur.move_function to have it count nodes, cutoffs and
+# table hits and time the phases of the search; give it a recorder to
+# stream one record per move, e.g.
+#
+#     stats = SearchStats(JsonlRecorder('search.jsonl'))
+#     arthur.move_function(board, 6, stats=stats)
+#
+# Searches without stats only test it against None.
+#
+# Created October 18, 2026
+
+import json
+import time
+
+### CLASSES
+
+class SearchStats:
+    def __init__(self, recorder=None):
+        """
+            Creates empty statistics. If recorder is given, it is called
+            with record() at the end of every search.
+        """
+        self.recorder = recorder
+        self.reset()
+
+    def reset(self):
+        """
+            Zeroes every counter and timer, at the start of a search.
+        """
+        self.interior_nodes = 0
+        self.leaf_nodes = 0
+        self.quiescence_nodes = 0
+        self.reductions = 0
+        self.futility_pruned = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.eval_hits = 0
+        self.eval_misses = 0
+        self.movegen_time = 0.0
+        self.push_time = 0.0
+        self.score_time = 0.0
+        self.total_time = 0.0
+        self.depth = None
+        self.move = None
+        self.score = None
+
+    def timed_moves(self, moves):
+        """
+            Yields the moves of the iterator moves, adding the time
+            spent producing each to movegen_time.
+        """
+        clock = time.time
+        while True:
+            start = clock()
+            try:
+                move = next(moves)
+            except StopIteration:
+                self.movegen_time += clock() - start
+                return
+            self.movegen_time += clock() - start
+            yield move
+
+    def nodes(self):
+        """
+            Returns the number of interior and leaf nodes together.
+        """
+        return self.interior_nodes + self.leaf_nodes
+
+    def branching_factor(self):
+        """
+            Returns the effective branching factor, the depth-th root of
+            the number of nodes, or None before depth 1 is reached.
+        """
+        if not self.depth:
+            return None
+        return self.nodes() ** (1.0 / self.depth)
+
+    def record(self):
+        """
+            Returns the statistics as a dict of plain values.
+        """
+        def rate(hits, total):
+            return float(hits) / total if total else None
+        return {
+            'move': self.move,
+            'score': self.score,
+            'depth': self.depth,
+            'nodes': self.nodes(),
+            'interior_nodes': self.interior_nodes,
+            'leaf_nodes': self.leaf_nodes,
+            'quiescence_nodes': self.quiescence_nodes,
+            'reductions': self.reductions,
+            'futility_pruned': self.futility_pruned,
+            'branching_factor': self.branching_factor(),
+            'cutoffs': self.cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': rate(self.first_move_cutoffs, self.cutoffs),
+            'tt_probes': self.tt_probes,
+            'tt_hit_rate': rate(self.tt_hits, self.tt_probes),
+            'tt_cutoffs': self.tt_cutoffs,
+            'eval_hit_rate': rate(self.eval_hits, self.eval_hits + self.eval_misses),
+            'movegen_time': self.movegen_time,
+            'push_time': self.push_time,
+            'score_time': self.score_time,
+            'total_time': self.total_time,
+        }
+
+    def finish(self):
+        """
+            Passes record() to the recorder, if there is one.
+        """
+        if self.recorder is not None:
+            self.recorder(self.record())
+
+class JsonlRecorder:
+    def __init__(self, path, mode='a'):
+        """
+            Creates a recorder appending one JSON line per record to the
+            file at path.
+        """
+        self.file = open(path, mode)
+
+    def __call__(self, record):
+        self.file.write(json.dumps(record, sort_keys=True) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,404 @@
+"""
+    This module defines the Tablebase class and the endgame tablebase
+    generator.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Endgame tablebases: the won, lost or drawn result of every position
+# with few pieces, and how many plies the win or loss takes, worked
+# out backwards from the positions where the side to move has no
+# moves, e.g.
+#
+#     python tablebase.py generate --pieces 4
+#     python tablebase.py info
+#
+# There is one file per material configuration (black men, black
+# kings, white men, white kings), holding one byte per position with
+# black to move. A position with white to move is looked up flipped
+# (see CheckerBoard.flipped), as the same position with the colours
+# swapped, in the table of the swapped configuration, so each result
+# is stored once.
+#
+# A position's place in its file is a perfect hash of where its
+# pieces stand: the colex rank of each kind of piece's squares,
+# combined as the digits of a mixed-radix number. Men never stand on
+# the row they are crowned on. Placements that put two pieces on one
+# square have a byte too, marked ILLEGAL, so that the index needs no
+# correction.
+#
+# Tables are read through mmap, so probing a position touches one
+# page of one file and whole tables are never loaded.
+#
+# Created October 18, 2026
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from array import array
+from itertools import combinations, product
+
+from bitboard import SQUARES, flip, popcount
+from checkers import BLACK, WHITE, CheckerBoard
+
+### CONSTANTS
+
+# Where tables are written and read by default
+DIRECTORY = 'tablebases'
+
+# Results, from the side to move's point of view
+WIN, DRAW, LOSS = 1, 0, -1
+
+# Byte values. 0 is a draw, ILLEGAL a placement with pieces on top of
+# each other, and anything else one more than the number of plies to
+# the end of the game: odd plies for a win, even for a loss.
+ILLEGAL = 255
+MAX_PLIES = 253
+
+# The bitboard squares each kind of piece can stand on, in the order
+# (black men, black kings, white men, white kings). Black men are
+# crowned on squares 29 to 32 and white men on squares 1 to 4.
+PIECE_SQUARES = (SQUARES[:28], SQUARES, SQUARES[4:], SQUARES)
+
+# Place of every square in each list of PIECE_SQUARES
+_PLACE = [dict((sq, i) for (i, sq) in enumerate(squares)) for squares in PIECE_SQUARES]
+
+# _BINOMIAL[n][k] is n choose k.
+_BINOMIAL = [[1] + [0] * 32 for _ in range(33)]
+for _n in range(1, 33):
+    for _k in range(1, 33):
+        _BINOMIAL[_n][_k] = _BINOMIAL[_n - 1][_k - 1] + _BINOMIAL[_n - 1][_k]
+
+### FUNCTIONS
+
+def material(board):
+    """
+        Returns the bitboards of board's black men, black kings, white
+        men and white kings.
+    """
+    return (board.forward[BLACK] & ~board.backward[BLACK], board.backward[BLACK],
+            board.backward[WHITE] & ~board.forward[WHITE], board.forward[WHITE])
+
+def configurations(pieces):
+    """
+        Returns every material configuration with both colours on the
+        board and at most pieces pieces, in an order where every
+        configuration a move can lead to from one comes before it.
+    """
+    configs = []
+    for counts in product(range(pieces + 1), repeat=4):
+        (black_men, black_kings, white_men, white_kings) = counts
+        if black_men + black_kings and white_men + white_kings and sum(counts) <= pieces:
+            configs.append(counts)
+    # Captures take pieces off and promotions turn men into kings.
+    configs.sort(key=lambda c: (sum(c), c[0] + c[2], c))
+    return configs
+
+def table_size(config):
+    """
+        Returns the number of placements of config, one side to move.
+    """
+    size = 1
+    for (squares, count) in zip(PIECE_SQUARES, config):
+        size *= _BINOMIAL[len(squares)][count]
+    return size
+
+def file_name(config):
+    return "%i%i%i%i.tb" % config
+
+def placements(kind, count):
+    """
+        Returns the bitboards of every way count pieces of the given
+        kind (an index into PIECE_SQUARES) can stand, in colex order.
+    """
+    squares = PIECE_SQUARES[kind]
+    combos = sorted(combinations(range(len(squares)), count), key=lambda c: c[::-1])
+    return [sum(squares[i] for i in c) for c in combos]
+
+def mirror(config):
+    """
+        Returns config with the colours swapped.
+    """
+    return config[2:] + config[:2]
+
+def _rank(groups, config):
+    """
+        Returns the place in config's table of the position with the
+        pieces of each kind on the squares set in groups.
+    """
+    i = 0
+    for (kind, group) in enumerate(groups):
+        squares = PIECE_SQUARES[kind]
+        place = _PLACE[kind]
+        rank = 0
+        k = 1
+        while group:
+            sq = group & -group
+            rank += _BINOMIAL[place[sq]][k]
+            group ^= sq
+            k += 1
+        i = i * _BINOMIAL[len(squares)][config[kind]] + rank
+    return i
+
+def _flipped(groups):
+    """
+        Returns the material bitboards of the position given by groups
+        turned round with the colours swapped (see CheckerBoard.flipped).
+    """
+    (bm, bk, wm, wk) = groups
+    return (flip(wm), flip(wk), flip(bm), flip(bk))
+
+def index(board):
+    """
+        Returns the material configuration of board's position with
+        black to move, flipped if need be, and its place in that
+        configuration's table.
+    """
+    groups = material(board)
+    if board.active == WHITE:
+        groups = _flipped(groups)
+    config = tuple(popcount(g) for g in groups)
+    return (config, _rank(groups, config))
+
+def decode(value):
+    """
+        Returns the (result, plies) a table byte stands for, or None
+        for ILLEGAL.
+    """
+    if value == ILLEGAL:
+        return None
+    if value == 0:
+        return (DRAW, 0)
+    plies = value - 1
+    return (WIN if plies % 2 else LOSS, plies)
+
+def solve(config, solved):
+    """
+        Returns the tables of config and of mirror(config), as
+        bytearrays, given the solved tables of every configuration they
+        can lead to in the dict solved.
+
+        Every move is made once to build the graph of the positions in
+        config, with either side to move. The results then flow back
+        from the positions already decided, in order of plies: a
+        position is won once one of its moves leads to a loss, and lost
+        once all of them lead to wins. Whatever is left undecided is a
+        draw. The positions with white to move, flipped, are those of
+        mirror(config) with black to move.
+    """
+    size = table_size(config)
+    values = bytearray(2 * size)
+    # Moves within config, as parallel arrays of from and to positions
+    sources = array('l')
+    targets = array('l')
+    # Moves left that do not lead to a win for the other side, and the
+    # longest such win seen so far
+    remaining = array('l', [0]) * (2 * size)
+    longest = array('l', [0]) * (2 * size)
+    # Positions decided at each number of plies, as (position, result)
+    pending = {}
+
+    def decide(position, result, plies):
+        pending.setdefault(plies, []).append((position, result))
+
+    # The place of every position's flipped twin in mirror(config)
+    mirrored = array('l', [0]) * size
+
+    B = CheckerBoard()
+    groups = [placements(kind, count) for (kind, count) in enumerate(config)]
+    total = sum(config)
+    for (i, (bm, bk, wm, wk)) in enumerate(product(*groups)):
+        mirrored[i] = _rank(_flipped((bm, bk, wm, wk)), mirror(config))
+        if popcount(bm | bk | wm | wk) != total:
+            values[i] = values[size + i] = ILLEGAL
+            continue
+        for active in (BLACK, WHITE):
+            position = active * size + i
+            B.set_position(bm, bk, wm, wk, active)
+            moves = B.get_moves(True)
+            if not moves:
+                decide(position, LOSS, 0)
+                continue
+            for move in moves:
+                B.push(move)
+                if not B.pieces[B.active]:
+                    result = (LOSS, 0)
+                else:
+                    child = material(B)
+                    if tuple(popcount(g) for g in child) == config:
+                        sources.append(position)
+                        targets.append(B.active * size + _rank(child, config))
+                        remaining[position] += 1
+                        result = None
+                    else:
+                        (child_config, child) = index(B)
+                        result = decode(solved[child_config][child])
+                B.pop()
+                if result is not None and result[0] == WIN:
+                    longest[position] = max(longest[position], result[1] + 1)
+                elif result is not None:
+                    # A position with a move to a draw or to a loss for
+                    # the other side is never lost.
+                    remaining[position] += 1
+                    if result[0] == LOSS:
+                        decide(position, WIN, result[1] + 1)
+            if not remaining[position]:
+                decide(position, LOSS, longest[position])
+
+    # The moves into every position, grouped by the position moved to
+    starts = array('l', [0]) * (2 * size + 1)
+    for target in targets:
+        starts[target + 1] += 1
+    for position in range(2 * size):
+        starts[position + 1] += starts[position]
+    filled = array('l', starts)
+    predecessors = array('l', [0]) * len(sources)
+    for (source, target) in zip(sources, targets):
+        predecessors[filled[target]] = source
+        filled[target] += 1
+
+    while pending:
+        plies = min(pending)
+        if plies > MAX_PLIES:
+            raise ValueError("%s has a result %i plies away; at most %i fit in a byte"
+                             % (file_name(config), plies, MAX_PLIES))
+        for (position, result) in pending.pop(plies):
+            if values[position]:
+                continue
+            values[position] = plies + 1
+            for source in predecessors[starts[position]:starts[position + 1]]:
+                if values[source]:
+                    continue
+                if result == LOSS:
+                    decide(source, WIN, plies + 1)
+                else:
+                    remaining[source] -= 1
+                    longest[source] = max(longest[source], plies + 1)
+                    if not remaining[source]:
+                        decide(source, LOSS, longest[source])
+
+    table = values[:size]
+    twin = bytearray(size)
+    for i in range(size):
+        twin[mirrored[i]] = values[size + i]
+    return (table, twin)
+
+def generate(pieces, directory=DIRECTORY, force=False, log=None):
+    """
+        Writes the table of every configuration of at most pieces pieces
+        to directory, solving each in turn. Tables already written are
+        reused unless force is set. log, if given, is called with a line
+        of progress per table.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    solved = {}
+    for config in configurations(pieces):
+        if config in solved:
+            continue
+        paths = [os.path.join(directory, file_name(c)) for c in (config, mirror(config))]
+        start = time.time()
+        if all(os.path.exists(path) for path in paths) and not force:
+            for (c, path) in zip((config, mirror(config)), paths):
+                with open(path, 'rb') as f:
+                    solved[c] = bytearray(f.read())
+            continue
+        (solved[config], solved[mirror(config)]) = solve(config, solved)
+        for (c, path) in zip((config, mirror(config)), paths):
+            with open(path + '.tmp', 'wb') as f:
+                f.write(solved[c])
+            os.rename(path + '.tmp', path)
+        if log is not None:
+            log("%s %9i positions %8.1fs" % (file_name(config), 2 * table_size(config),
+                                             time.time() - start))
+
+### CLASSES
+
+class Tablebase:
+    def __init__(self, directory=DIRECTORY):
+        """
+            Opens the tables in directory. Each file is mapped into
+            memory the first time a position is looked up in it.
+        """
+        self.directory = directory
+        self.configs = set()
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if name.endswith('.tb') and len(name) == 7 and name[:4].isdigit():
+                self.configs.add(tuple(int(c) for c in name[:4]))
+        # The most pieces of any configuration there is a table for
+        self.pieces = max([sum(c) for c in self.configs] or [0])
+        self.tables = {}
+        self.probes = 0
+        self.hits = 0
+
+    def table(self, config):
+        """
+            Returns the memory-mapped table of config.
+        """
+        table = self.tables.get(config)
+        if table is None:
+            with open(os.path.join(self.directory, file_name(config)), 'rb') as f:
+                table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.tables[config] = table
+        return table
+
+    def probe(self, board):
+        """
+            Returns (result, plies) for the side to move in board, or
+            None if board has too many pieces, is in the middle of a
+            jump sequence or has no table.
+        """
+        self.probes += 1
+        if board.jump or popcount(board.pieces[BLACK] | board.pieces[WHITE]) > self.pieces:
+            return None
+        (config, i) = index(board)
+        if config not in self.configs:
+            return None
+        self.hits += 1
+        return decode(ord(self.table(config)[i:i + 1]))
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+### MAIN
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Endgame tablebases for CheckerBoard.")
+    parser.add_argument("--directory", default=DIRECTORY)
+    commands = parser.add_subparsers()
+
+    gen = commands.add_parser("generate", help="solve every configuration up to some pieces")
+    gen.add_argument("--pieces", type=int, default=4)
+    gen.add_argument("--force", action="store_true", help="solve tables already written again")
+    gen.set_defaults(run=lambda args: generate(args.pieces, args.directory, args.force, print_line))
+
+    info = commands.add_parser("info", help="count the wins, draws and losses of every table")
+    info.set_defaults(run=run_info)
+
+    args = parser.parse_args(argv)
+    return args.run(args) or 0
+
+def print_line(line):
+    print(line)
+    sys.stdout.flush()
+
+def run_info(args):
+    tb = Tablebase(args.directory)
+    for config in sorted(tb.configs, key=lambda c: (sum(c), c[0] + c[2], c)):
+        counts = {WIN: 0, DRAW: 0, LOSS: 0}
+        longest = 0
+        table = bytearray(tb.table(config)[:])
+        for value in table:
+            result = decode(value)
+            if result is not None:
+                counts[result[0]] += 1
+                longest = max(longest, result[1])
+        print("%s %9i wins %9i draws %9i losses, longest %3i plies"
+              % (file_name(config), counts[WIN], counts[DRAW], counts[LOSS], longest))
+    tb.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,33 +1,10 @@
-import checkers
-import agent
-import arthur
-import random_agent
+import sys
 
-BLACK, WHITE = 0, 1
+import tournament
 
-f = open('logfile', 'w')
-
-for i in range(100):
-    print "game: " + str(i)
-    B = checkers.CheckerBoard()
-    cpu_1 = agent.CheckersAgent(lambda board: arthur.move_function(board, 4))
-    cpu_2 = agent.CheckersAgent(lambda board: arthur.move_function(board, 6))
-    current_player = B.active
-    turn = 1
-    while not B.is_over():
-        f.write(str(B))
-        if turn % 100 == 0:
-            print "# of turns: " + str(turn)
-        B.make_move(cpu_1.make_move(B))
-        if B.active == current_player:
-            continue
-        current_player = B.active
-        turn += 1
-        while not B.is_over() and B.active == current_player:
-            B.make_move(cpu_2.make_move(B))
-        current_player = B.active
-    if B.active == WHITE:
-        print "Congrats Black, you win!"
-    else:
-        print "Congrats White, you win!"
-    print "Game took %i turns" % turn
+# 100 games of arthur at depth 4 against arthur at depth 6, played in
+# parallel with colours alternating. Every game is written to
+# test_results.jsonl.
+sys.exit(tournament.main(['arthur:depth=4', 'arthur:depth=6',
+                          '--games', '100', '--output', 'test_results.jsonl']
+                         + sys.argv[1:]))
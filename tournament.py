@@ -0,0 +1,248 @@
+"""
+    This module implements a headless tournament runner.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Plays matches between two agents in a pool of processes, writing
+# every game to a JSON lines file and summing up the result with an
+# Elo estimate, e.g.
+#
+#     python tournament.py arthur:depth=4 arthur:depth=6 --games 100
+#
+# An agent is the name of a module with a move_function, optionally
+# followed by a colon and comma-separated keyword arguments for it,
+# such as arthur:time_limit=0.5 or random_agent.
+#
+# Created October 18, 2026
+
+import argparse
+import inspect
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+import agent
+import checkers
+from transposition import TranspositionTable
+
+### CONSTANTS
+
+BLACK, WHITE = 0, 1
+
+### AGENTS
+
+def parse_agent(spec):
+    """
+        Returns the module name and keyword arguments of an agent spec
+        such as "arthur:depth=4,time_limit=0.5". Values are read as ints
+        or floats where possible.
+    """
+    (name, _, args) = spec.partition(':')
+    kwargs = {}
+    for pair in filter(None, args.split(',')):
+        (key, _, value) = pair.partition('=')
+        for kind in (int, float):
+            try:
+                value = kind(value)
+                break
+            except ValueError:
+                pass
+        kwargs[key.strip()] = value
+    return (name, kwargs)
+
+def load_agent(spec):
+    """
+        Returns a CheckersAgent playing as spec describes.
+
+        If the module's move_function takes a table, the agent gets a
+        transposition table of its own, so that two configurations of
+        one engine never share results.
+    """
+    (name, kwargs) = parse_agent(spec)
+    __import__(name)
+    move_function = sys.modules[name].move_function
+    try:
+        params = inspect.getfullargspec(move_function).args
+    except AttributeError:
+        params = inspect.getargspec(move_function).args
+    if 'table' in params and 'table' not in kwargs:
+        kwargs['table'] = TranspositionTable()
+    return agent.CheckersAgent(lambda board: move_function(board, **kwargs))
+
+### GAMES
+
+def play_game(game):
+    """
+        Plays one game described by a dict with the keys game, seed,
+        black and white (agent specs), opening_plies, max_plies,
+        draw_plies and adjudication, and returns the dict with the
+        outcome added: winner ('black', 'white' or None for a draw),
+        reason, plies, moves and seconds.
+
+        The first opening_plies moves are random, chosen by a generator
+        seeded with seed, which also seeds the random module for agents
+        that use it. Games are drawn by repetition and by the
+        draw_plies move-count rule, as CheckerBoard.outcome() decides.
+        A game still going after max_plies is adjudicated on material
+        if adjudication is set, and is otherwise a draw.
+    """
+    start = time.time()
+    rng = random.Random(game['seed'])
+    random.seed(game['seed'])
+    players = [load_agent(game['black']), load_agent(game['white'])]
+    B = checkers.CheckerBoard(game['draw_plies'] or None, game['adjudication'])
+    moves = []
+    while not B.is_over() and len(moves) < game['max_plies']:
+        if len(moves) < game['opening_plies']:
+            move = rng.choice(B.get_moves())
+        else:
+            move = players[B.active].make_move(B)
+        B.push(move)
+        moves.append(move)
+    result = dict(game)
+    outcome = B.outcome()
+    if outcome is None:
+        winner = B.adjudicate()
+        outcome = (winner, 'max plies' if winner is None else checkers.ADJUDICATION)
+    result['winner'] = {BLACK: 'black', WHITE: 'white', None: None}[outcome[0]]
+    result['reason'] = outcome[1]
+    result['plies'] = len(moves)
+    result['moves'] = moves
+    result['seconds'] = time.time() - start
+    return result
+
+def schedule(first, second, games, seed=0, alternate=True, opening_plies=0, max_plies=400,
+             draw_plies=checkers.DRAW_PLIES, adjudication=None):
+    """
+        Returns the list of games to play between agent specs first and
+        second. With alternate, the agents swap colours every game and
+        each pair of games shares a seed, so both sides get to play
+        each random opening.
+    """
+    schedule = []
+    for i in range(games):
+        if alternate:
+            (black, white) = (first, second) if i % 2 == 0 else (second, first)
+            game_seed = seed + i // 2
+        else:
+            (black, white) = (first, second)
+            game_seed = seed + i
+        schedule.append({'game': i, 'seed': game_seed, 'black': black, 'white': white,
+                         'opening_plies': opening_plies, 'max_plies': max_plies,
+                         'draw_plies': draw_plies, 'adjudication': adjudication})
+    return schedule
+
+def first_agent_score(result, first):
+    """
+        Returns 1, 0.5 or 0 for a win, draw or loss of agent spec first
+        in a game result.
+    """
+    if result['winner'] is None:
+        return 0.5
+    return 1 if result[result['winner']] == first else 0
+
+def play(games, processes=None):
+    """
+        Plays games in a pool of processes, yielding the results in the
+        order they finish.
+    """
+    if processes == 1:
+        for game in games:
+            yield play_game(game)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(play_game, games):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+### STATISTICS
+
+def elo(score):
+    """
+        Returns the Elo difference that an expected score between 0
+        and 1 corresponds to.
+    """
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+def elo_estimate(wins, draws, losses):
+    """
+        Returns the Elo difference of a wins/draws/losses record and the
+        half-width of its 95% confidence interval.
+    """
+    n = wins + draws + losses
+    if n == 0:
+        return (0.0, float('inf'))
+    score = (wins + 0.5 * draws) / float(n)
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    margin = 1.96 * math.sqrt(variance / n)
+    return (elo(score), (elo(score + margin) - elo(score - margin)) / 2)
+
+def summary(first, second, wins, draws, losses, seconds):
+    """
+        Returns the lines reporting a match result from first's side.
+    """
+    n = wins + draws + losses
+    (diff, margin) = elo_estimate(wins, draws, losses)
+    return ["%s vs %s: %i games" % (first, second, n),
+            "W/D/L: %i/%i/%i" % (wins, draws, losses),
+            "Elo: %+.1f +/- %.1f" % (diff, margin),
+            "%.1f games per hour" % (n * 3600.0 / max(seconds, 1e-9))]
+
+### MAIN
+
+def add_draw_arguments(parser):
+    """
+        Adds the --draw-plies and --adjudication options to parser.
+    """
+    parser.add_argument("--draw-plies", type=int, default=checkers.DRAW_PLIES,
+                        help="plies without a capture or man move after which a game is "
+                             "a draw (0 for no limit)")
+    parser.add_argument("--adjudication", type=int, default=None,
+                        help="material lead (2 per man, 3 per king) that wins a game "
+                             "ended by the draw rules or max plies")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plays a match between two checkers agents.")
+    parser.add_argument("first", help="agent spec, e.g. arthur:depth=4")
+    parser.add_argument("second", help="agent spec, e.g. arthur:time_limit=0.5")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-alternate", dest="alternate", action="store_false",
+                        help="first always plays black")
+    parser.add_argument("--opening-plies", type=int, default=0,
+                        help="random moves at the start of every game")
+    parser.add_argument("--max-plies", type=int, default=400,
+                        help="plies after which a game is a draw")
+    add_draw_arguments(parser)
+    parser.add_argument("--output", default="tournament.jsonl")
+    args = parser.parse_args(argv)
+
+    games = schedule(args.first, args.second, args.games, args.seed, args.alternate,
+                     args.opening_plies, args.max_plies, args.draw_plies,
+                     args.adjudication)
+    record = [0, 0, 0]
+    start = time.time()
+    with open(args.output, 'w') as f:
+        for result in play(games, args.processes):
+            f.write(json.dumps(result, sort_keys=True) + "\n")
+            f.flush()
+            score = first_agent_score(result, args.first)
+            record[{1: 0, 0.5: 1, 0: 2}[score]] += 1
+            print("game %i: %s (%s, %i plies)" % (result['game'], result['winner'] or 'draw',
+                                                  result['reason'], result['plies']))
+    for line in summary(args.first, args.second, record[0], record[1], record[2],
+                        time.time() - start):
+        print(line)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
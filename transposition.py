@@ -0,0 +1,148 @@
+"""
+    This module defines the TranspositionTable and
+    SharedTranspositionTable classes.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# A size-bounded transposition table keyed by the Zobrist hash
+# of a CheckerBoard, and a lockless variant held in shared memory
+# that several forked search processes can use at once.
+#
+# Created October 18, 2026
+
+import mmap
+import struct
+
+### CONSTANTS
+
+# Kinds of stored values. An EXACT value is the true negamax value of
+# the position; a LOWER bound comes from a search that failed high
+# (beta cutoff) and an UPPER bound from one that failed low.
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Replacement policies for a slot that already holds a different
+# position. REPLACE_ALWAYS overwrites unconditionally. REPLACE_DEPTH
+# keeps the deeper of the two entries, unless the old entry was stored
+# by an earlier search, in which case it is overwritten.
+REPLACE_ALWAYS = 'always'
+REPLACE_DEPTH = 'depth'
+
+# A shared entry: check word, value, the low 64 bits of the move and
+# the rest of it (composite moves are wider than 64 bits), depth, flag
+# and generation. The check word is the key XORed with the other
+# fields, so a reader that sees half of one write and half of another
+# finds the key does not match and treats the slot as empty.
+_ENTRY = struct.Struct('<QqQhhBB2x')
+_MASK = 2**64 - 1
+
+### CLASSES
+
+class TranspositionTable:
+    def __init__(self, size=2**18, replacement=REPLACE_DEPTH):
+        """
+            Creates an empty table with room for size entries.
+        """
+        if replacement not in (REPLACE_ALWAYS, REPLACE_DEPTH):
+            raise ValueError("Unknown replacement policy: %r" % (replacement,))
+        self.size = size
+        self.replacement = replacement
+        self.clear()
+
+    def clear(self):
+        """
+            Removes every entry from the table.
+        """
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        """
+            Marks the start of a new search. Entries left over from
+            earlier searches stay usable but become the first to go
+            under REPLACE_DEPTH.
+        """
+        self.generation += 1
+
+    def probe(self, key):
+        """
+            Returns the entry stored for key, or None.
+
+            An entry is a tuple (key, depth, flag, value, move, generation).
+        """
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        """
+            Records the result of searching the position with the given
+            key to the given depth, subject to the replacement policy.
+        """
+        i = key % self.size
+        old = self.entries[i]
+        if old is not None and self.replacement == REPLACE_DEPTH:
+            if old[5] == self.generation and old[1] > depth:
+                return
+        self.entries[i] = (key, depth, flag, value, move, self.generation)
+
+class SharedTranspositionTable:
+    def __init__(self, size=2**18, replacement=REPLACE_DEPTH):
+        """
+            Creates an empty table with room for size entries, in an
+            anonymous shared mapping. Processes forked after it is
+            created read and write the same entries, without locks.
+
+            Generations are kept modulo 256, and a move of None is
+            stored as 0, which is never a legal move.
+        """
+        if replacement not in (REPLACE_ALWAYS, REPLACE_DEPTH):
+            raise ValueError("Unknown replacement policy: %r" % (replacement,))
+        self.size = size
+        self.replacement = replacement
+        self.buffer = mmap.mmap(-1, size * _ENTRY.size)
+        self.generation = 0
+
+    def clear(self):
+        """
+            Removes every entry from the table.
+        """
+        self.buffer.seek(0)
+        self.buffer.write(b'\0' * (self.size * _ENTRY.size))
+        self.generation = 0
+
+    def new_search(self):
+        """
+            Marks the start of a new search, as TranspositionTable does.
+            Call it before forking so every process agrees on it.
+        """
+        self.generation = (self.generation + 1) % 256
+
+    def probe(self, key):
+        """
+            Returns the entry stored for key, or None.
+
+            An entry is a tuple (key, depth, flag, value, move, generation).
+        """
+        (check, value, low, high, depth, flag, generation) = \
+            _ENTRY.unpack_from(self.buffer, (key % self.size) * _ENTRY.size)
+        meta = (high & 0xffff) << 32 | depth << 16 | flag << 8 | generation
+        if check ^ (value & _MASK) ^ low ^ meta != key:
+            return None
+        return (key, depth, flag, value, (high << 64 | low) or None, generation)
+
+    def store(self, key, depth, flag, value, move):
+        """
+            Records the result of searching the position with the given
+            key to the given depth, subject to the replacement policy.
+        """
+        offset = (key % self.size) * _ENTRY.size
+        if self.replacement == REPLACE_DEPTH:
+            old = _ENTRY.unpack_from(self.buffer, offset)
+            if old[6] == self.generation and old[4] > depth:
+                return
+        move = move or 0
+        (low, high) = (move & _MASK, move >> 64)
+        meta = (high & 0xffff) << 32 | depth << 16 | flag << 8 | self.generation
+        check = key ^ (value & _MASK) ^ low ^ meta
+        _ENTRY.pack_into(self.buffer, offset, check, value, low, high, depth, flag, self.generation)
@@ -0,0 +1,284 @@
+"""
+    This module implements consistency checks for the engine.
+"""
+# Andrew Edwards -- almostimplemented.com
+# =======================================
+# Checks that the optimised parts of the engine agree with the simple
+# code they replace, over a corpus of positions, e.g.
+#
+#     python validate.py features --positions 5000
+#     python validate.py symmetry
+#     python validate.py composite
+#     python validate.py sprt
+#     python validate.py drawn
+#
+# Created October 18, 2026
+
+import argparse
+import random
+import sys
+
+import arthur
+import corpus
+import sprt
+from checkers import BLACK, ADJUDICATION, CheckerBoard, board_from_squares, flip_move
+from transposition import TranspositionTable
+
+### CHECKS
+
+FEATURE_FUNCTIONS = ['adv', 'back', 'cent', 'cntr', 'deny', 'kcent', 'mob', 'mov', 'thret']
+
+def check_features(boards):
+    """
+        Compares arthur.features() against the individual feature
+        functions on every board and returns a list of mismatches.
+    """
+    failures = []
+    for (i, B) in enumerate(boards):
+        h = B.hash
+        f = arthur.features(B)
+        if B.hash != h:
+            failures.append((i, 'board changed'))
+        if f.over != (not B.has_moves()):
+            failures.append((i, 'over', f.over))
+        if f.over:
+            continue
+        for name in FEATURE_FUNCTIONS:
+            expected = getattr(arthur, name)(B)
+            if getattr(f, name) != expected:
+                failures.append((i, name, getattr(f, name), expected))
+        for player in (arthur.BLACK, arthur.WHITE):
+            diff = f.material[player] - f.material[player ^ 1]
+            if diff != arthur.piece_score_diff(B, player):
+                failures.append((i, 'material', player))
+            if f.position[player] != arthur.position_score(B, player):
+                failures.append((i, 'position', player))
+    return failures
+
+def run_features(args):
+    boards = corpus.positions(args.positions, args.seed)
+    failures = check_features(boards)
+    for failure in failures[:20]:
+        print("position %i: %r" % (failure[0], failure[1:]))
+    print("%i positions, %i mismatches" % (len(boards), len(failures)))
+    return 1 if failures else 0
+
+def check_symmetry(boards):
+    """
+        Compares every board with its flipped() twin and returns two
+        lists of mismatches. The first must be empty: the moves, which
+        must map onto each other by flip_move(), and canonical_hash().
+        The second holds the features, which an evaluation favouring
+        neither colour gives both alike, with the material and position
+        pairs swapped. Samuel's back and thret terms are known not to,
+        so these are reported but expected.
+    """
+    failures = []
+    asymmetries = []
+    for (i, B) in enumerate(boards):
+        F = B.flipped()
+        if F.flipped().hash != B.hash:
+            failures.append((i, 'flipped twice'))
+        if F.canonical_hash() != B.canonical_hash():
+            failures.append((i, 'canonical_hash'))
+        for composite in (False, True):
+            moves = sorted(flip_move(m) for m in B.get_moves(composite))
+            if moves != sorted(F.get_moves(composite)):
+                failures.append((i, 'moves', composite))
+        (f, g) = (arthur.features(B), arthur.features(F))
+        for name in f._fields:
+            (x, y) = (getattr(f, name), getattr(g, name))
+            if name in ('material', 'position'):
+                y = y[::-1]
+            if x != y:
+                asymmetries.append((i, name, x, y))
+    return (failures, asymmetries)
+
+def run_symmetry(args):
+    boards = corpus.positions(args.positions, args.seed)
+    (failures, asymmetries) = check_symmetry(boards)
+    for failure in failures[:20]:
+        print("position %i: %r" % (failure[0], failure[1:]))
+    for (label, found) in (("mismatches", failures), ("expected (evaluation)", asymmetries)):
+        counts = {}
+        for failure in found:
+            counts[failure[1]] = counts.get(failure[1], 0) + 1
+        for name in sorted(counts):
+            print("%-15s %i %s" % (name, counts[name], label))
+    print("%i positions, %i mismatches, %i expected evaluation asymmetries"
+          % (len(boards), len(failures), len(asymmetries)))
+    return 1 if failures else 0
+
+# Positions, as squares for (black men, black kings, white men, white
+# kings) and the side to move, where Black has two jump sequences of
+# three jumps that part only at the third
+BRANCHING_JUMPS = [
+    ([2], [], [7, 15, 22, 23], [], BLACK),
+    ([1], [], [6, 15, 18, 23, 24, 27], [], BLACK),
+    ([7], [], [11, 18, 19, 24, 26, 27], [], BLACK),
+]
+
+def check_composite(depth):
+    """
+        Plays the composite move arthur.move_function chooses in each
+        of BRANCHING_JUMPS one call per jump, and returns a list of
+        mismatches: every call after the first must return the next
+        jump of that move without searching.
+    """
+    failures = []
+    for (i, squares) in enumerate(BRANCHING_JUMPS):
+        B = board_from_squares(*squares)
+        info = {}
+        move = arthur.move_function(B, depth, table=TranspositionTable(), info=info,
+                                    composite=True)
+        hops = B.hops(info['pv'][0])
+        if move != hops[0]:
+            failures.append((i, 'jump 1', move, hops[0]))
+        if len(hops) < 3:
+            failures.append((i, 'short sequence', len(hops)))
+        for (n, hop) in enumerate(hops[:-1]):
+            B.push(hop)
+            info = {}
+            move = arthur.move_function(B, depth, table=TranspositionTable(), info=info,
+                                        composite=True)
+            if move != hops[n + 1]:
+                failures.append((i, 'jump %i' % (n + 2), move, hops[n + 1]))
+            if info['nodes']:
+                failures.append((i, 'searched jump %i' % (n + 2), info['nodes']))
+    return failures
+
+def run_composite(args):
+    failures = check_composite(args.depth)
+    for failure in failures:
+        print("position %i: %r" % (failure[0], failure[1:]))
+    print("%i positions, %i mismatches" % (len(BRANCHING_JUMPS), len(failures)))
+    return 1 if failures else 0
+
+# (elo0, elo1) hypotheses the SPRT check runs its streaks against
+SPRT_HYPOTHESES = [(0, 20), (0, 100), (0, 400), (-20, 0)]
+
+def check_sprt(games):
+    """
+        Runs sprt.decision() after each of games games that all end
+        the same way, for each result and each of SPRT_HYPOTHESES, and
+        returns a list of mismatches: a streak of one result must not
+        stop the match. A record of every result, in the proportions
+        H1 predicts, must then go on to accept H1.
+    """
+    failures = []
+    for (elo0, elo1) in SPRT_HYPOTHESES:
+        state = {'elo0': elo0, 'elo1': elo1, 'alpha': 0.05, 'beta': 0.05}
+        for result in ('wins', 'draws', 'losses'):
+            state.update(wins=0, draws=0, losses=0)
+            for n in range(1, games + 1):
+                state[result] = n
+                if sprt.decision(state) is not None:
+                    failures.append(((elo0, elo1), result, n, sprt.decision(state)))
+                    break
+        # A record of 4000 games scoring as a player elo1 + 50 stronger
+        # would, half the games the weaker side does not lose drawn
+        score = sprt.expected_score(elo1 + 50)
+        state.update(wins=int(4000 * (score - (1 - score) / 2)),
+                     draws=int(4000 * (1 - score)), losses=int(4000 * (1 - score) / 2))
+        if sprt.decision(state) != sprt.H1:
+            failures.append(((elo0, elo1), 'record', sprt.decision(state)))
+    return failures
+
+def run_sprt(args):
+    failures = check_sprt(args.games)
+    for failure in failures:
+        print("%r" % (failure,))
+    print("%i hypotheses, %i mismatches" % (len(SPRT_HYPOTHESES), len(failures)))
+    return 1 if failures else 0
+
+# The move limit and adjudication margin of the games check_drawn
+# plays, short and small enough that most games end by them
+DRAWN_PLIES = 12
+DRAWN_ADJUDICATION = 2
+
+def check_drawn(games, seed, depth=1, randomness=0.3):
+    """
+        Plays games self-play games, as corpus.positions() does, under
+        DRAWN_PLIES and DRAWN_ADJUDICATION, and returns a list of
+        mismatches and a dict counting the positions compared by how
+        the game loop scores them. Wherever the game loop ends a game
+        by repetition or the move limit, is_drawn() must stop the
+        search, and at every position where it does, drawn_value()
+        must score the game as CheckerBoard.outcome() does.
+    """
+    rng = random.Random(seed)
+    failures = []
+    counts = {}
+    for game in range(games):
+        B = CheckerBoard(DRAWN_PLIES, DRAWN_ADJUDICATION)
+        while B.has_moves():
+            result = B.outcome()
+            drawn = not B.jump and arthur.is_drawn(B)
+            if result is not None and not drawn:
+                failures.append((game, len(B.undo_stack), 'not drawn', result[1]))
+            if drawn:
+                expected = 0
+                if result is not None and result[1] == ADJUDICATION:
+                    expected = arthur.INFINITY if result[0] == BLACK else -arthur.INFINITY
+                value = arthur.drawn_value(B, BLACK)
+                if value != expected:
+                    failures.append((game, len(B.undo_stack), result, value, expected))
+                reason = 'repeated once' if result is None else result[1]
+                counts[reason] = counts.get(reason, 0) + 1
+            if result is not None:
+                break
+            if rng.random() < randomness:
+                move = rng.choice(B.get_moves())
+            else:
+                move = arthur.move_function(B, depth, table=TranspositionTable(1024))
+            B.push(move)
+    return (failures, counts)
+
+def run_drawn(args):
+    (failures, counts) = check_drawn(args.games, args.seed)
+    for failure in failures[:20]:
+        print("game %i ply %i: %r" % (failure[0], failure[1], failure[2:]))
+    for reason in sorted(counts):
+        print("%-15s %i positions" % (reason, counts[reason]))
+    print("%i games, %i mismatches" % (args.games, len(failures)))
+    return 1 if failures else 0
+
+### MAIN
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checkers engine consistency checks.")
+    commands = parser.add_subparsers()
+
+    features = commands.add_parser("features",
+                                   help="fused feature extractor versus the feature functions")
+    features.add_argument("--positions", type=int, default=2000)
+    features.add_argument("--seed", type=int, default=0)
+    features.set_defaults(run=run_features)
+
+    symmetry = commands.add_parser("symmetry",
+                                   help="boards versus their flipped twins")
+    symmetry.add_argument("--positions", type=int, default=2000)
+    symmetry.add_argument("--seed", type=int, default=0)
+    symmetry.set_defaults(run=run_symmetry)
+
+    composite = commands.add_parser("composite",
+                                    help="composite moves played one jump per call")
+    composite.add_argument("--depth", type=int, default=4)
+    composite.set_defaults(run=run_composite)
+
+    streaks = commands.add_parser("sprt",
+                                  help="SPRT decisions on streaks of one result")
+    streaks.add_argument("--games", type=int, default=20)
+    streaks.set_defaults(run=run_sprt)
+
+    drawn = commands.add_parser("drawn",
+                                help="search draw scores versus the game loop's outcome")
+    drawn.add_argument("--games", type=int, default=200)
+    drawn.add_argument("--seed", type=int, default=0)
+    drawn.set_defaults(run=run_drawn)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())